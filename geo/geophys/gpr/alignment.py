@@ -0,0 +1,92 @@
+"""Align GPR lines to a regular grid using integer line and trace offsets.
+
+Positions are converted to integer offsets from the grid datum once so that lines can be placed into a 3D array with slice assignment rather than by searching lists of rounded floats.
+"""
+
+import numpy as np
+
+
+def offsets(values, origin, step):
+    """Return the integer number of grid steps between each value and the grid origin.
+        Attributes:
+            values <list>: positions (m) such as the first trace of each line or the transect coordinate of each line;
+            origin <float>: the grid datum (m);
+            step <float>: the grid interval (m) between traces or lines.
+    """
+    v = np.asarray(values, dtype=float)
+    o = np.rint((v - origin) / step).astype(int)
+    return(o)
+
+def place_lines(arrays, rows, columns, shape, directions=None, dtype=float):
+    """Return a 3D array (lines x samples x traces) with each radargram placed at its line and trace offset. Traces and samples falling outside the array are clipped and, where lines overlap, later lines overwrite earlier ones.
+        Attributes:
+            arrays <list>: radargram arrays (samples x traces);
+            rows <list>: the line index of each radargram in the output array;
+            columns <list>: the trace index in the output array of the first measured trace of each radargram;
+            shape <tuple>: the number of lines, samples and traces of the output array;
+            directions <list>: the measurement direction of each radargram, positive (True) or negative (False); all positive when None;
+            dtype <type>: the data type of the output array.
+    """
+    cube = np.zeros(shape, dtype=dtype)
+    l, m, n = shape
+    d = directions if directions is not None else [True] * len(arrays)
+    for a, r, c, pos in zip(arrays, rows, columns, d):
+        if not pos:
+            a = a[:, ::-1]
+            c = c - a.shape[1] + 1
+        c0, c1 = max(c, 0), min(c + a.shape[1], n)
+        if not 0 <= r < l or c0 >= c1:
+            continue
+        s = min(a.shape[0], m)
+        cube[r, :s, c0:c1] = a[:s, c0 - c:c1 - c]
+    return(cube)
+
+def pair_lags(cube, window=None, max_shift=None):
+    """Return the trace lag of each line against the previous line of a 3D array (lines x samples x traces), found by cross-correlating a window of samples of all adjacent pairs at once with FFTs. A positive lag means the features of a line lie at higher trace indices than those of the previous line.
+        Attributes:
+            cube <numpy.array>: a 3D GPR array (lines x samples x traces);
+            window <tuple>: the first and last (exclusive) sample of the correlation window, e.g. shallow times with strong horizontal continuity; all samples when None;
+            max_shift <int>: the largest lag (traces) searched; a quarter of the traces when None.
+    """
+    w = slice(*window) if window else slice(None)
+    a = np.asarray(cube[:, w], dtype=float)
+    a = a - a.mean(axis=-1, keepdims=True) # remove horizontal banding that would correlate at zero lag
+    n = a.shape[-1]
+    nfft = 1 << (2 * n - 1).bit_length()
+    F = np.fft.rfft(a, nfft, axis=-1)
+    c = np.fft.irfft((np.conj(F[:-1]) * F[1:]).sum(axis=1), nfft, axis=-1)
+    m = n // 4 if max_shift is None else max_shift
+    lags = np.arange(-m, m + 1)
+    lag = lags[np.argmax(c[:, lags % nfft], axis=1)]
+    return(lag)
+
+def zigzag_shifts(cube, directions, window=None, max_shift=None):
+    """Return the trace shift of every line of a bidirectional (zig-zag) survey and the offset between the two directions. The offset is half the difference between the median lags of positive-to-negative and negative-to-positive pairs of adjacent lines, so that dipping features cancel; lines of the negative direction are shifted by the offset and the other lines are unchanged.
+        Attributes:
+            cube <numpy.array>: a 3D GPR array (lines x samples x traces);
+            directions <list>: the measurement direction of each line, positive (True) or negative (False); lines without data may be None;
+            window <tuple>: the first and last (exclusive) sample of the correlation window;
+            max_shift <int>: the largest lag (traces) searched.
+    """
+    d = np.array([np.nan if i is None else float(bool(i)) for i in directions])
+    lag = pair_lags(cube, window, max_shift)
+    to_negative = (d[:-1] == 1) & (d[1:] == 0)
+    to_positive = (d[:-1] == 0) & (d[1:] == 1)
+    if not (to_negative.any() and to_positive.any()):
+        return(np.zeros(len(d), dtype=int), 0)
+    offset = int(np.rint((np.median(lag[to_negative]) - np.median(lag[to_positive])) / 2))
+    shifts = np.where(d == 0, offset, 0)
+    return(shifts, offset)
+
+def shift_lines(cube, shifts):
+    """Return a copy of a 3D array (lines x samples x traces) with each line moved by minus its trace shift in one indexing step; traces moved in from outside the array are zero.
+        Attributes:
+            cube <numpy.array>: a 3D GPR array (lines x samples x traces);
+            shifts <list>: the integer trace shift of each line, e.g. from 'zigzag_shifts'.
+    """
+    n = cube.shape[-1]
+    idx = np.arange(n)[None, :] + np.asarray(shifts, dtype=int)[:, None]
+    valid = (idx >= 0) & (idx < n)
+    out = np.take_along_axis(cube, np.clip(idx, 0, n - 1)[:, None, :], axis=-1)
+    out = np.where(valid[:, None, :], out, 0).astype(cube.dtype)
+    return(out)
@@ -0,0 +1,115 @@
+"""Read and write GPR lines as ReflexW-style fixed-width ASCII columns."""
+
+from os import stat
+from os.path import isfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+
+# fixed-width layouts of 1 (amplitude), 3 (distance, time, amplitude) and 4 (distance, transect, time, amplitude) columns
+FORMATS = {
+    1: '%15.6f',
+    3: '%14.6f%15.6f%15.6f',
+    4: '%14.6f%15.6f%15.6f%15.6f',
+}
+
+
+def ascii_columns(line, columns, first, last):
+    """Return a 2D array of the output columns of a range of traces, ordered trace by trace.
+        Attributes:
+            line <object>: A line object with 'array', 'time', 'start_position', 'step' and, for 4 columns, 'transect_coord' attributes;
+            columns <int>: The number of output columns (1, 3 or 4);
+            first <int>: The index of the first trace;
+            last <int>: The index of the last trace (exclusive).
+    """
+    m = min(line.array.shape[0], len(line.time))
+    amp = line.array[:m, first:last]
+    n = amp.shape[1]
+    cols = [amp.T.ravel()]
+    if columns > 1:
+        x = np.round(line.start_position + np.arange(first, first + n) * line.step, 6)
+        t = np.tile(np.asarray(line.time[:m], dtype=float), n)
+        cols = [np.repeat(x, m)] + [t] + cols
+    if columns == 4:
+        cols.insert(1, np.full(m * n, line.transect_coord, dtype=float))
+    arr = np.column_stack(cols)
+    return(arr)
+
+def write_ascii(line, path, columns=3, chunk=256):
+    """Write a line object to a fixed-width ASCII file. Traces are formatted and written in chunks so memory use is bounded by the chunk size rather than the line length.
+        Attributes:
+            line <object>: A line object as used by 'ascii_columns';
+            path <str>: filesystem path of the output file;
+            columns <int>: The number of output columns (1, 3 or 4);
+            chunk <int>: The number of traces formatted per write.
+    """
+    fmt = FORMATS[columns]
+    n = line.array.shape[1]
+    with open(path, 'w', newline='') as f:
+        for i in range(0, n, chunk):
+            arr = ascii_columns(line, columns, i, min(i + chunk, n))
+            np.savetxt(f, arr, fmt=fmt, newline='\r\n')
+    return(path)
+
+def lines_to_ascii(lines, paths, columns=3, chunk=256, processes=None):
+    """Write many line objects to fixed-width ASCII files, in parallel unless 'processes' is 1.
+        Attributes:
+            lines <list>: A list of line objects as used by 'ascii_columns';
+            paths <list>: A list of output paths, one for each line;
+            columns <int>: The number of output columns (1, 3 or 4);
+            chunk <int>: The number of traces formatted per write;
+            processes <int>: The number of worker processes; defaults to the number of processors.
+    """
+    args = (lines, paths, repeat(columns), repeat(chunk))
+    if processes == 1:
+        return(list(map(write_ascii, *args)))
+    with ProcessPoolExecutor(max_workers=processes) as ex:
+        out = list(ex.map(write_ascii, *args))
+    return(out)
+
+def read_ascii(path, cache=True):
+    """Read a whitespace-delimited ASCII file, such as a ReflexW 3-column export, into a 2D array (rows x columns) using the pandas C parser. With 'cache' the array is saved to a binary '.npz' sidecar beside the file and reused while the size and modification time of the file are unchanged.
+        Attributes:
+            path <str>: filesystem path to an ASCII file;
+            cache <bool>: read and write the binary sidecar.
+    """
+    st = stat(path)
+    stamp = np.array([st.st_mtime_ns, st.st_size])
+    npz = path + '.npz'
+    if cache and isfile(npz):
+        with np.load(npz) as f:
+            if np.array_equal(f['stamp'], stamp):
+                return(f['data'])
+    data = pd.read_csv(path, sep=r'\s+', header=None, engine='c').to_numpy(dtype=float)
+    if cache:
+        try:
+            np.savez(npz, data=data, stamp=stamp)
+        except OSError as e:
+            print(e)
+    return(data)
+
+def ascii2grid(data):
+    """Return the sorted unique x and y values and a 2D array (y x x) of the values of 3-column data such as a radargram of distance, time and amplitude. Missing points are NaN.
+        Attributes:
+            data <numpy.array>: A 2D array of x, y and value columns, e.g. from 'read_ascii'.
+    """
+    x, xi = np.unique(data[:,0], return_inverse=True)
+    y, yi = np.unique(data[:,1], return_inverse=True)
+    arr = np.full((len(y), len(x)), np.nan)
+    arr[yi, xi] = data[:,2]
+    return(x, y, arr)
+
+def ascii2cube(paths, cache=True):
+    """Return the sorted unique x and y values of all files and a 3D array (files x y x x) of 3-column ASCII files, such as the radargrams of a grid. Files are aligned on the union of their x and y values and missing points are NaN.
+        Attributes:
+            paths <list>: filesystem paths to 3-column ASCII files;
+            cache <bool>: read and write the binary sidecar of each file.
+    """
+    data = [read_ascii(i, cache) for i in paths]
+    x = np.unique(np.concatenate([i[:,0] for i in data]))
+    y = np.unique(np.concatenate([i[:,1] for i in data]))
+    arr = np.full((len(data), len(y), len(x)), np.nan)
+    for n, d in enumerate(data):
+        arr[n, np.searchsorted(y, d[:,1]), np.searchsorted(x, d[:,0])] = d[:,2]
+    return(x, y, arr)
@@ -0,0 +1,81 @@
+"""Cache GPR arrays in memory so that segments can be opened without reading their data.
+
+Arrays are loaded on first access and kept in a least-recently-used cache bounded by their total size in bytes. The arrays of a group of segments, such as the lines of one grid, can be read ahead in a background thread while earlier lines are processed.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+class ArrayCache:
+    """A thread-safe least-recently-used cache of numpy arrays bounded by their total size.
+        Attributes:
+            maxbytes <int>: the maximum total size (bytes) of the cached arrays; the least recently used arrays are dropped first and an array larger than the limit is returned without being cached.
+    """
+
+    def __init__(self, maxbytes=2 ** 30):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._arrays = OrderedDict()
+        self._lock = Lock()
+        self._pool = None
+
+    def __len__(self):
+        return(len(self._arrays))
+
+    def __contains__(self, key):
+        return(key in self._arrays)
+
+    def get(self, key, load):
+        """Return the cached array of a key, calling 'load' without arguments to read it if it is not cached."""
+        with self._lock:
+            if key in self._arrays:
+                self._arrays.move_to_end(key)
+                return(self._arrays[key])
+        a = load()
+        self.put(key, a)
+        return(a)
+
+    def put(self, key, array):
+        """Add an array to the cache and drop the least recently used arrays above the size limit."""
+        with self._lock:
+            if key in self._arrays:
+                self.nbytes -= self._arrays.pop(key).nbytes
+            if array.nbytes > self.maxbytes:
+                return
+            self._arrays[key] = array
+            self.nbytes += array.nbytes
+            while self.nbytes > self.maxbytes:
+                k, a = self._arrays.popitem(last=False)
+                self.nbytes -= a.nbytes
+
+    def drop(self, key):
+        """Remove an array from the cache."""
+        with self._lock:
+            if key in self._arrays:
+                self.nbytes -= self._arrays.pop(key).nbytes
+
+    def clear(self):
+        """Remove all arrays from the cache."""
+        with self._lock:
+            self._arrays.clear()
+            self.nbytes = 0
+
+    def prefetch(self, items):
+        """Load the arrays of (key, load) pairs into the cache in order in a background thread and return a future of the number of arrays read. Arrays are read one after another so that the first lines are ready first."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1)
+        items = list(items)
+        def run():
+            n = 0
+            for k, f in items:
+                if k not in self:
+                    self.get(k, f)
+                    n += 1
+            return(n)
+        return(self._pool.submit(run))
+
+
+# the cache shared by segments unless another is given
+ARRAYS = ArrayCache()
@@ -1,6 +1,8 @@
 
 """Various calculations specific to GPR data processing"""
 
+import numpy as np
+
 def ns2mm(time, velocity):
     """Return the distance (mm) from signal travel time (ns) and velocity (m/ns).
         Attributes:
@@ -43,3 +45,77 @@ def time(frequency, samples, precision=6):
     return(times)
 
 
+
+
+class Axis:
+    """A regularly spaced axis of a GPR array, such as trace distances or sample times, stored as its first value, step and count. Values are calculated on demand, and positions are found by arithmetic rather than by searching lists of rounded floats. An axis can be indexed, iterated and measured like the list it replaces.
+        Attributes:
+            start <float>: the first value;
+            step <float>: the interval between values;
+            count <int>: the number of values;
+            precision <int>: the number of decimals values are rounded to.
+    """
+
+    __slots__ = ('start', 'step', 'count', 'precision')
+
+    def __init__(self, start, step, count, precision=7):
+        self.start = start
+        self.step = step
+        self.count = int(count)
+        self.precision = precision
+
+    def __repr__(self):
+        return(str.format('Axis(start={0}, step={1}, count={2}, precision={3})', self.start, self.step, self.count, self.precision))
+
+    def __len__(self):
+        return(self.count)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return(self.values[i].tolist())
+        n = i + self.count if i < 0 else i
+        if not 0 <= n < self.count:
+            raise IndexError('Axis index out of range')
+        return(round(self.start + n * self.step, self.precision))
+
+    def __iter__(self):
+        return(iter(self.values.tolist()))
+
+    def __contains__(self, value):
+        try:
+            self.index(value)
+            return(True)
+        except ValueError:
+            return(False)
+
+    def __eq__(self, other):
+        if isinstance(other, Axis):
+            return((self.start, self.step, self.count, self.precision) == (other.start, other.step, other.count, other.precision))
+        return(NotImplemented)
+
+    @property
+    def values(self):
+        """Return the values as a numpy array, rounded as by the built-in 'round' like single values."""
+        x = self.start + self.step * np.arange(self.count)
+        v = np.round(x, self.precision)
+        s = x * 10 ** self.precision
+        tie = np.flatnonzero(np.abs(s - np.floor(s) - 0.5) < 1e-6) # numpy may round these the other way
+        v[tie] = [round(i, self.precision) for i in x[tie].tolist()]
+        return(v)
+
+    @property
+    def stop(self):
+        """Return the last value."""
+        return(self[-1])
+
+    def index(self, value):
+        """Return the integer index of a value, which must lie on the axis within its precision."""
+        i = int(round((value - self.start) / self.step))
+        if not 0 <= i < self.count or round(self.start + i * self.step, self.precision) != round(value, self.precision):
+            raise ValueError(str(value) + ' is not on the axis')
+        return(i)
+
+    def indices(self, values):
+        """Return the nearest integer indices of an array of values; indices may fall outside the axis."""
+        i = np.rint((np.asarray(values, dtype=float) - self.start) / self.step).astype(int)
+        return(i)
@@ -0,0 +1,98 @@
+"""Store 3D GPR arrays on disk in chunks for grids larger than memory.
+
+A cube (lines x samples x traces) is split into chunks of several lines and a band of samples, each saved as a memory-mapped '.npy' file with all traces of the grid. Reading a radargram touches one chunk of lines per band of samples and reading a timeslice touches one band of samples per chunk of lines, so that both access patterns read contiguous rows of traces.
+"""
+
+import json
+from os import makedirs
+from os.path import isdir, isfile, join
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+class CubeStore:
+    """A lines x samples x traces array stored on disk in chunks that can be written line by line and read as radargrams or timeslices.
+        Attributes:
+            directory <str>: the directory of the store; an existing store is opened when 'shape' is None;
+            shape <tuple>: the number of lines, samples and traces of a new store;
+            chunks <tuple>: the number of lines and samples of each chunk;
+            dtype <str>: the data type of a new store.
+    """
+
+    def __init__(self, directory, shape=None, chunks=(8, 64), dtype='int16'):
+        self.directory = d = directory
+        meta = join(d, 'cube.json')
+        if shape is None:
+            with open(meta, 'r') as f:
+                m = json.load(f)
+            shape, chunks, dtype = m['shape'], m['chunks'], m['dtype']
+        else:
+            if not isdir(d):
+                makedirs(d)
+            with open(meta, 'w') as f:
+                json.dump({'shape': list(shape), 'chunks': list(chunks), 'dtype': str(np.dtype(dtype))}, f)
+        self.shape = tuple(shape)
+        self.chunks = tuple(chunks)
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self):
+        return(self.shape[0])
+
+    def __getitem__(self, n):
+        return(self.radargram(n))
+
+    def __setitem__(self, n, array):
+        self.write_line(n, array)
+
+    def _chunk(self, i, j, mode='r'):
+        """Return a memory-mapped chunk from its line and sample chunk indices, creating it filled with zeros when written to for the first time."""
+        l, m, n = self.shape
+        cl, cs = self.chunks
+        path = join(self.directory, 'chunk_' + str(i) + '_' + str(j) + '.npy')
+        if not isfile(path):
+            if mode == 'r':
+                return(None)
+            shape = (min(cl, l - i * cl), min(cs, m - j * cs), n)
+            return(open_memmap(path, mode='w+', dtype=self.dtype, shape=shape))
+        return(open_memmap(path, mode=mode))
+
+    def write_line(self, n, array):
+        """Write a radargram (samples x traces) to a line of the store; the array is clipped or zero-padded to the store shape."""
+        l, m, t = self.shape
+        cl, cs = self.chunks
+        a = np.zeros((m, t), dtype=self.dtype)
+        s, w = min(array.shape[0], m), min(array.shape[1], t)
+        a[:s, :w] = array[:s, :w]
+        for j in range(0, m, cs):
+            c = self._chunk(n // cl, j // cs, 'r+')
+            c[n % cl] = a[j:j + cs]
+            c.flush()
+
+    def radargram(self, n):
+        """Return the radargram (samples x traces) of a line."""
+        l, m, t = self.shape
+        cl, cs = self.chunks
+        a = np.zeros((m, t), dtype=self.dtype)
+        for j in range(0, m, cs):
+            c = self._chunk(n // cl, j // cs)
+            if c is not None:
+                a[j:j + cs] = c[n % cl]
+        return(a)
+
+    def timeslice(self, k):
+        """Return the timeslice (lines x traces) of a sample."""
+        return(self.timeslices(k, k + 1)[0])
+
+    def timeslices(self, start, stop):
+        """Return the timeslices (samples x lines x traces) of a range of samples, reading each chunk once."""
+        l, m, t = self.shape
+        cl, cs = self.chunks
+        stop = min(stop, m)
+        a = np.zeros((max(stop - start, 0), l, t), dtype=self.dtype)
+        for j in range(start // cs, -(-stop // cs)):
+            k0, k1 = max(start, j * cs), min(stop, (j + 1) * cs)
+            for i in range(0, l, cl):
+                c = self._chunk(i // cl, j)
+                if c is not None:
+                    a[k0 - start:k1 - start, i:i + cl] = np.swapaxes(c[:, k0 - j * cs:k1 - j * cs], 0, 1)
+        return(a)
@@ -1,16 +1,20 @@
 
 """Useful filesystem operations"""
 
-from os import walk
-from os.path import basename, dirname, join, splitext
+from os import scandir, stat, walk
+from os.path import abspath, basename, dirname, isfile, join, normpath, splitext
 from glob import glob
+import pandas as pd
 
-def get_file_path(path, ext):
+def get_file_path(path, ext, index=None):
     """Return the path to an existing file from a root example.
         Attributes:
             path <str>: A filesystem path with or without an extension;
-            ext <str>: An case-insensitive extension required for output.
+            ext <str>: An case-insensitive extension required for output;
+            index <SurveyIndex>: An optional survey index used instead of searching the filesystem.
     """
+    if index is not None:
+        return(index.get_file_path(path, ext))
     b, e = splitext(path)
     lst = [i for i in glob(b + '*') if splitext(i)[1].lower() == ext.lower()]
     try:
@@ -19,8 +23,10 @@ def get_file_path(path, ext):
         return(None)
 
 
-def list_gpr_data(path, ext):
-    """Find all files recursively with the given extension (case insensitive)."""
+def list_gpr_data(path, ext, index=None):
+    """Find all files recursively with the given extension (case insensitive), from a survey index if given."""
+    if index is not None:
+        return(index.list(ext, path))
     lst = []
     for r, d, f in walk(path):
         for i in f:
@@ -37,3 +43,119 @@ def get_folder_and_filename(path):
     l = [d, f]
     return(l)
 
+
+
+class SurveyIndex:
+    """A persistent table of the files of a survey directory (path, base name, extension, size and modification time) so that file lookups are dictionary hits rather than directory scans. The table is saved as CSV files in the survey directory and, when reloaded, only directories whose modification time has changed are rescanned. Note that a directory's modification time changes when files are added, removed or renamed but not when a file is modified in place.
+        Attributes:
+            rdir <str>: The root directory of the survey;
+            name <str>: The base filename of the CSV files of the index.
+    """
+
+    columns = ['path', 'base', 'ext', 'size', 'mtime']
+
+    def __init__(self, rdir, name='survey_index'):
+        self.rdir = abspath(rdir)
+        self.name = name
+        self.csv = join(self.rdir, name + '.csv')
+        self.dirs_csv = join(self.rdir, name + '_dirs.csv')
+        self.files = {} # relative directory: {filename: (size, mtime)}
+        self.mtimes = {} # relative directory: modification time (ns)
+        if isfile(self.csv) and isfile(self.dirs_csv):
+            self._read()
+            self.update()
+        else:
+            self._scan('.')
+            self.save()
+        self._lookup()
+
+    def _scan(self, d):
+        """Record the files of a relative directory and scan any subdirectories not already indexed."""
+        p = join(self.rdir, d)
+        self.mtimes[d] = stat(p).st_mtime_ns
+        files, dirs = {}, []
+        with scandir(p) as it:
+            for i in it:
+                if i.is_dir():
+                    dirs.append(normpath(join(d, i.name)))
+                elif not (d == '.' and i.name.startswith(self.name)):
+                    st = i.stat()
+                    files[i.name] = (st.st_size, st.st_mtime_ns)
+        self.files[d] = files
+        for i in dirs:
+            if i not in self.mtimes:
+                self._scan(i)
+
+    def update(self):
+        """Rescan directories that have changed since the index was saved and return a list of them."""
+        changed = []
+        for d in list(self.mtimes):
+            try:
+                m = stat(join(self.rdir, d)).st_mtime_ns
+            except FileNotFoundError:
+                self.mtimes.pop(d)
+                self.files.pop(d, None)
+                changed.append(d)
+                continue
+            if m != self.mtimes[d]:
+                self._scan(d)
+                changed.append(d)
+        if changed:
+            self.save()
+            self._lookup()
+        return(changed)
+
+    def table(self):
+        """Return the index as a pandas dataframe with one row per file."""
+        rows = []
+        for d, files in self.files.items():
+            for f, (size, mtime) in files.items():
+                b, e = splitext(f)
+                rows.append((normpath(join(d, f)), b, e.lower(), size, mtime))
+        df = pd.DataFrame(rows, columns=self.columns).sort_values('path')
+        return(df)
+
+    def save(self):
+        """Write the file table and directory modification times to CSV."""
+        self.table().to_csv(self.csv, index=False)
+        self.mtimes['.'] = stat(self.rdir).st_mtime_ns # writing the index may change the root directory
+        df = pd.DataFrame(list(self.mtimes.items()), columns=['folder', 'mtime'])
+        df.to_csv(self.dirs_csv, index=False)
+
+    def _read(self):
+        """Load the index from CSV."""
+        df = pd.read_csv(self.dirs_csv, keep_default_na=False)
+        self.mtimes = dict(zip(df['folder'], df['mtime']))
+        self.files = {i: {} for i in self.mtimes}
+        df = pd.read_csv(self.csv, keep_default_na=False)
+        for p, size, mtime in zip(df['path'], df['size'], df['mtime']):
+            d = dirname(p) or '.'
+            self.files.setdefault(d, {})[basename(p)] = (size, mtime)
+
+    def _lookup(self):
+        """Build dictionaries of file paths by base path and extension, and of sorted paths by extension."""
+        self.paths = {}
+        self.extensions = {}
+        for d, files in self.files.items():
+            for f in files:
+                p = join(self.rdir, d, f)
+                b, e = splitext(normpath(p))
+                e = e.lower()
+                self.paths[(b, e)] = p
+                self.extensions.setdefault(e, []).append(normpath(p))
+        [i.sort() for i in self.extensions.values()]
+
+    def get_file_path(self, path, ext):
+        """Return the indexed path of a file from a path with or without an extension and a case-insensitive extension, or None."""
+        p = normpath(abspath(path))
+        e = ext.lower()
+        return(self.paths.get((p, e)) or self.paths.get((splitext(p)[0], e)))
+
+    def list(self, ext, path=None):
+        """Return a sorted list of indexed paths with the given extension (case insensitive), optionally within a subdirectory."""
+        e = '.' + ext.lower().lstrip('.')
+        lst = self.extensions.get(e, [])
+        if path:
+            p = join(normpath(abspath(path)), '')
+            lst = [i for i in lst if i.startswith(p)]
+        return(list(lst))
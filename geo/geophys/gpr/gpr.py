@@ -40,7 +40,6 @@ from os import listdir, makedirs, walk
 from os.path import basename, isdir, join, splitext
 import csv
 from glob import glob
-import itertools
 import tempfile
 import numpy as np
 import pandas as pd
@@ -50,8 +49,16 @@ import matplotlib.pyplot as plt
 from matplotlib import cm
 
 from ...gis.raster import RectifyTif
-from .mala import RD3
+from .mala import RD3, rad_table
+from .alignment import offsets, place_lines, zigzag_shifts, shift_lines
+from .ascii import write_ascii
+from .timeslice import window_slices
+from .migration import migrate
+from .tiles import write_tiled_tif, write_xyz
 from .metadata import MetaData
+from .graph import SliceViewer
+from .calculations import Axis, ns2mm, time
+from .cache import ARRAYS
 #from .calculations import *
 from .filesystem import list_gpr_data, get_folder_and_filename
 
@@ -67,56 +74,17 @@ def empty_array(rows, columns):
     return(arr)
 
 def line_to_ascii4(line, path):
-    """Convert a line object to ASCII 3-columns"""
-    x = line.start_position
-    y = line.transect_coord
-    print(line.array.shape)
-    with open(path, 'w') as f:
-        for array in line.array.T:
-            for amp, time in zip(array, line.time):
-                s = lambda x: str.format('{0:.6f}', x)[::-1]
-                d = s(x)
-                l = s(y)
-                t = s(time)
-                a = s(amp)
-                
-                wee = str(a.ljust(15) + t.ljust(15) + l.ljust(15) + d.ljust(14))[::-1] + '\r\n'
-                f.write(wee)
-                
-                #print(a)
-                #f.write(str.format('{0:.6f}', x) + '\t' + str.format('{0:.6f}', time) + '\t' + str.format('{0:.6f}', amp) + '\r\n')
-            x = round(x + line.step, 6)
+    """Convert a line object to ASCII 4-columns"""
+    write_ascii(line, path, columns=4)
 
 
 def line_to_ascii3(line, path):
     """Convert a line object to ASCII 3-columns"""
-    x = line.start_position
-    print(line.array.shape)
-    with open(path, 'w') as f:
-        for array in line.array.T:
-            for amp, time in zip(array, line.time):
-                s = lambda x: str.format('{0:.6f}', x)[::-1]
-                d = s(x)
-                t = s(time)
-                a = s(amp)
-                
-                wee = str(a.ljust(15) + t.ljust(15) + d.ljust(14))[::-1] + '\r\n'
-                f.write(wee)
-                
-                #print(a)
-                #f.write(str.format('{0:.6f}', x) + '\t' + str.format('{0:.6f}', time) + '\t' + str.format('{0:.6f}', amp) + '\r\n')
-            x = round(x + line.step, 6)
+    write_ascii(line, path, columns=3)
 
 def line_to_ascii1(line, path):
     """Convert a line object to ASCII 1-column"""
-    with open(path, 'w') as f:
-        for array in line.array.T:
-            for amp, time in zip(array, line.time):
-                s = lambda x: str.format('{0:.6f}', x)[::-1]
-                a = s(amp)
-                
-                wee = str(a.ljust(15))[::-1] + '\r\n'
-                f.write(wee)
+    write_ascii(line, path, columns=1)
                 
 
 def get_format(extension):
@@ -128,9 +96,10 @@ def get_format(extension):
 
 class Files(MetaData):
     """"""
-    def __init__(self, rdir, extension='rd3', name='files'):
-        """"""
+    def __init__(self, rdir, extension='rd3', name='files', index=None):
+        """Files are listed from a survey index ('filesystem.SurveyIndex') if given."""
         columns=['folder','filename', 'extension']
+        self.index = index
         MetaData.__init__(self, rdir, name, columns)
         self.if_empty(rdir, extension, columns)
         self.rdir = rdir
@@ -138,7 +107,7 @@ class Files(MetaData):
     def if_empty(self, rdir, ext, columns):
         df = self.read()
         if df.empty:
-            paths = list_gpr_data(rdir, ext)
+            paths = list_gpr_data(rdir, ext, self.index)
             lst = [get_folder_and_filename(i) + [ext] for i in paths]
             df = pd.DataFrame([i for i in lst], columns=columns)
             uid = pd.DataFrame([i+1 for i in df.index], columns=['id'])
@@ -146,6 +115,13 @@ class Files(MetaData):
             df['note'] = ''
             self.write(df)
 
+    def headers(self, threads=None):
+        """Return a table of the RAD headers of the files, read concurrently and cached in the survey directory (see 'mala.rad_table')."""
+        df = self.read()
+        paths = [join(self.rdir, str(f), str(n)) for f, n in zip(df['folder'], df['filename'])]
+        cache = join(self.rdir, self.name + '_headers.csv')
+        return(rad_table(paths, cache, threads, self.index))
+
 
 class Groups(MetaData):
     """"""
@@ -167,30 +143,49 @@ class OrthoCoords(MetaData):
 
 class Collection:
     """Create an object combining all metadata relevant to an analysis for targeted selection."""
-    def __init__(self, files, *args):
+    def __init__(self, files, *args, cache=None):
         self.f = f = files
         lst = [f.read()]
         for i in args:
             lst += [i.read()]
         self.metadata = pd.concat(lst, axis=1)
+        self.cache = cache if cache is not None else ARRAYS
 
     def get_segments(self):
+        """Return a segment for every row of metadata; arrays are not read until they are used."""
         r, m = self.f.rdir, self.metadata
-        s = [Segment(r, i) for n, i in m.iterrows()]
+        s = [Segment(r, i, self.cache) for n, i in m.iterrows()]
         return(s)
 
+    def prefetch(self, segments):
+        """Read the arrays of a list of segments, such as those of one grid, into the cache in a background thread and return a future of the number of arrays read."""
+        return(self.cache.prefetch([(i.key, i.reader.read) for i in segments]))
+
 
 class Segment:
-    """"""
-    def __init__(self, rdir, files):
+    """A segment with metadata from its file header and an array read on first access through an array cache ('cache.ArrayCache')."""
+    def __init__(self, rdir, files, cache=None):
         """"""
         f = files
         self.__dict__.update(f.to_dict())
 
         S = get_format(f.extension)
-        path = join(rdir, str(f.folder), str(f.filename))
-        d = S(path).__dict__
-        self.__dict__.update(d)
+        self.key = path = join(rdir, str(f.folder), str(f.filename))
+        self.cache = cache if cache is not None else ARRAYS
+        self.reader = S(path, lazy=True)
+        self.__dict__.update(self.reader.__dict__)
+        self._array = None
+
+    @property
+    def array(self):
+        """The segment array; an array set on the segment replaces the file data."""
+        if self._array is not None:
+            return(self._array)
+        return(self.cache.get(self.key, self.reader.read))
+
+    @array.setter
+    def array(self, array):
+        self._array = array
 
    
 class Parallel:
@@ -548,23 +543,21 @@ class Stack:
         self.velocity = velocity
         self.depths = self._get_depths()
 
-        line = self._empty_line()
-
         # this array is oriented to plot radargrams from the origin
-        self.array = np.stack([self.wee(i) for i in self.x])
+        self.array = self._stack()
 
     def _get_x(self):
         x = list(set([i.get_line_increment() for i in self.lines]))
         x.sort()
-        spacing = self._get_line_spacing(x)
-        total_lines = int((max(x) - min(x)) / spacing)
-        x = [min(x) + spacing * i for i in range(total_lines)]
+        spacing = self._get_line_spacing(x) if len(x) > 1 else 1
+        total_lines = round((max(x) - min(x)) / spacing) + 1
+        x = Axis(min(x), spacing, total_lines, self.precision)
         return(x)
 
     def _get_y(self, x0, length):
         x1 = x0 + length if length else max([max(i.x) for i in self.lines])
         traces = math.ceil((x1 - x0) / self.step)
-        x = [round(x0 + self.step * i, self.precision) for i in range(traces)]
+        x = Axis(x0, self.step, traces, self.precision)
         return(x)
 
     def _get_z(self):
@@ -608,60 +601,56 @@ class Stack:
         arr = np.zeros((m, n)) 
         return(arr)
 
-    def wee(self, x):
-        """"""
-        arr = self._empty_line()
-        lines = [i for i in self.lines if i.get_line_increment() == x]
-        for i in lines:
-            arr = self._update_array(arr, i)
-        return(arr)
-        
-    def _update_array(self, arr, line):
-        """"""
-        for n, i in enumerate(line.x):
-            if i in self.y: # lines may exceed length of the empty array
-                col = line.array[:,n]
-                idx = [n for n, j in enumerate(self.y) if j == i].pop()
-                arr[:,idx] = col
+    def _stack(self):
+        """Place every line into a 3D array at its integer line and trace offsets from the grid datum."""
+        L = self.lines
+        increments = [i.get_line_increment() for i in L]
+        rows = offsets(increments, self.x[0], self.x.step)
+        columns = offsets([i.x[0] for i in L], self.y[0], self.step)
+        directions = [len(i.x) < 2 or i.x[1] > i.x[0] for i in L]
+        shape = (len(self.x), len(self.z), len(self.y))
+        arr = place_lines([i.array for i in L], rows, columns, shape, directions)
+        self.directions = [None] * shape[0]
+        for r, d in zip(rows, directions):
+            if 0 <= r < shape[0]:
+                self.directions[r] = d
         return(arr)
+
+    def align_zigzag(self, window=None, max_shift=None):
+        """Correct the trace offset between the two directions of a bidirectional survey, found by cross-correlating a window of samples of adjacent lines, and return the shift of each line and the offset (traces).
+            Attributes:
+                window <tuple>: the first and last (exclusive) sample of the correlation window, e.g. shallow times; all samples when None;
+                max_shift <int>: the largest offset (traces) searched.
+        """
+        shifts, offset = zigzag_shifts(self.array, self.directions, window, max_shift)
+        self.array = shift_lines(self.array, shifts)
+        print('Zig-zag offset: ' + str(offset) + ' traces (' + str(round(offset * self.step, 4)) + ' m)')
+        return(shifts, offset)
        
 
-    def poo(self, stack, top, bottom):
-        """"""
-        mm = stack.depths
-        idx = [n for n, i in enumerate(mm) if i > top and i <= bottom]
-        lst = [stack.array[i] for i in idx]
-        arr_sum = sum([abs(i) for i in lst])
-        arr_norm = arr_sum / arr_sum.max()
-        return(arr_norm)
-
-    def bum(self, thickness):
-        """"""
-        # rotate stack to be in order of timeslices
-        array = np.rot90(self.array, axes=(0,1))
-        # reverse array to make ground surface the top
-        array = np.flip(array, axis=[0])
-        mm = [i for i in self.depths]
-        poo = self.chunks(mm, 50 / 1000) 
-        wee = []
-        for i in poo:
-            idx = [n for n, j in enumerate(self.depths) if j in i]
-            lst = [array[j] for j in idx]
-            arr_sum = sum([abs(j) for j in lst])
-            arr_norm = arr_sum / arr_sum.max()
-            wee += [arr_norm]
-
-        return(wee)
-
-
-    def chunks(self, l, n):
-        """Yield successive n-sized chunks from l."""
-        pee = n
-        lst = []
-        while (n < max(l)):
-            lst += [[i for i in l if i >= n-pee and i <= n]]
-            n = n+pee
-        return(lst)
+    def migrate(self, method='stolt', **kwargs):
+        """Return the array migrated with the stack velocity, trace step and line spacing; see 'migration.migrate' for methods and arguments."""
+        dt = self.times[1] - self.times[0]
+        dy = self.x[1] - self.x[0] if len(self.x) > 1 else None
+        arr = migrate(self.array, self.step, dt, self.velocity, dy=dy, method=method, **kwargs)
+        return(arr)
+
+    def poo(self, stack, top, bottom, envelope=False):
+        """Return a normalised timeslice of the absolute amplitude, or envelope, summed between two depths (m)."""
+        arr = window_slices(stack.array, stack.depths, [top, bottom], axis=1, envelope=envelope)
+        return(arr[0])
+
+    def bum(self, thickness=0.05, mode='sum', envelope=False):
+        """Return a list of normalised timeslices of absolute amplitude, or envelope, aggregated over depth windows of the given thickness (m).
+            Attributes:
+                thickness <float>: the thickness (m) of each depth window;
+                mode <str>: 'sum', 'rms' or 'max' as in 'window_slices';
+                envelope <bool>: aggregate the Hilbert envelope instead of the absolute amplitude.
+        """
+        d = np.asarray(self.depths)
+        edges = np.arange(0, d.max() + thickness, thickness)
+        arr = window_slices(self.array, d, edges, mode=mode, axis=1, envelope=envelope)
+        return(list(arr))
 
 
 
@@ -723,6 +712,14 @@ class TimeSlice(RectifyTif):
             plt.axis('off')
         plt.savefig(path, dpi=dpi, format=format, bbox_inches=bbox_inches, pad_inches=pad_inches)
         plt.close()
+
+    def tiled_tif(self, path, array, transform, crs=None, **kwargs):
+        """Write a timeslice, or a stack of timeslices, straight from the array to a tiled GeoTIFF with overviews; see 'gis.raster.write_tiled_tif'."""
+        return(write_tiled_tif(array, path, transform, crs, **kwargs))
+
+    def xyz(self, directory, array, cmap='rainbow', **kwargs):
+        """Write a timeslice as an XYZ pyramid of PNG tiles and return the maximum zoom level; see 'tiles.write_xyz'."""
+        return(write_xyz(array, directory, cmap=cmap, **kwargs))
  
 
 
@@ -1112,7 +1109,9 @@ class segments2array(object):
         ramac = [rd3(i) for i in spath]
 
         self.arr = [i.arr for i in ramac]
-        self.headers = [i.info for i in ramac]
+        self.headers = rad_table(spath)
+        if self.headers['mismatch'].any():
+            print('WARNING: segment parameters differ: ' + ', '.join(self.headers.loc[self.headers['mismatch'], 'path']))
 
         self.x = list(set(self.sx))
         self.x.sort()
@@ -1147,12 +1146,12 @@ class segments2array(object):
 
     def samples(self):
         """Return the average number of samples of the input line segments"""
-        s = int(round(pd.Series([i['SAMPLES'] for i in self.headers]).mean()))
+        s = int(round(self.headers['SAMPLES'].mean()))
         return(s)
 
     def time_interval(self):
-        """Return the average two-way time interval between samples of the input line segments. TThis method needs some way of checking whether the values are significantly different for cases where the input segments were measured using different measurement parameters."""
-        i = round(pd.Series([1 / i['FREQUENCY'] * 1000 for i in self.headers]).mean(), 5)
+        """Return the average two-way time interval between samples of the input line segments. Segments measured with different parameters are flagged in the 'mismatch' column of the header table."""
+        i = round((1000 / self.headers['FREQUENCY']).mean(), 5)
         return(i)
 
     def time(self):
@@ -1163,8 +1162,8 @@ class segments2array(object):
         return(labs)
 
     def distance_interval(self):
-        """Return the average distance interval between traces of the input line segments. This method needs some way of checking whether the values are significantly different for cases where the input segments were measured using different measurement parameters"""
-        i = float(round(pd.Series([i['DISTANCE INTERVAL'] for i in self.headers]).mean(), 6))
+        """Return the average distance interval between traces of the input line segments. Segments measured with different parameters are flagged in the 'mismatch' column of the header table."""
+        i = float(round(self.headers['DISTANCE INTERVAL'].mean(), 6))
         return(i)
 
     def distance(self):
@@ -1184,86 +1183,21 @@ class segments2array(object):
         return(idx)
 
     def build_array(self):
+        """Assemble the segments of every line into a single lines x samples x traces array clipped and padded to the grid."""
         idx = [self.lineidx(i) for i in self.x]
-        lines = []
-        for i in idx:
-            x = set([self.sx[j] for j in i]).pop()
-            print('Line x = ' + str(x))
-            a = [self.arr[j] for j in i]
-            t =  [x2trace(self.sy[j], self.distance_interval()) for j in i]
-            d = [self.sdir[j] for j in i]
-            s = [i for i in zip(a, t, d)]
-            line = segments2line(s)
-
-            line = line[0:self.samples(),:len(self.distance())] # clip to maximum sample and trace of grid length
-
-            dt = len(self.distance()) - line.shape[1]
-            z = np.array([int(0) for i in range(line.shape[0] * dt)]).reshape(line.shape[0], dt)
-            line = np.append(line, z, axis = 1) # add columns if line is short
-
-            # add rows if samples are short (not needed to implement as yet)
-            ds = self.samples() - line.shape[0]
-            if ds > 0:
-                z = np.array([[int(0) for j in range(line.shape[1])] for i in range(ds)])
-                line = np.append(line, z, axis = 0) # add rows if line is short
-
-            line = line.astype(int)
-            lines += [line]
-
-        stack = np.stack(lines)
+        dx = self.distance_interval()
+        lines = [[(self.arr[j], x2trace(self.sy[j], dx), self.sdir[j]) for j in i] for i in idx]
+        stack = segments2grid(lines, self.samples(), len(self.distance()))
         return(stack)
 
 
-def analyse_timeslice(a, velocity):
-    """Scroll through timeslices; this is an effort to enable plotting timeslices and radargrams together and scroll through"""
-    import matplotlib.pyplot as plt
-    from matplotlib import cm
-
-    # plot timeslices
+def analyse_timeslice(a, velocity, radargram=None):
+    """Scroll through timeslices with the left and right arrow keys, optionally beside a radargram with a cursor at the depth of the slice; see 'graph.SliceViewer'."""
     ts = a.stack.timeslices
-    x = a.x
-    y = a.y
-    z = a.z
-    d = [ns2mm(i / 2 / 1000, velocity) for i in z]
-
-    line_spacing = x[1] - x[0]
-    distance_interval = y[1] - y[0]
-    
-    # create a 21 x 21 vertex mesh
-    X, Y = np.meshgrid(np.linspace(0,max(x),len(x)), np.linspace(0,max(y),len(y)))
-
-    global curr_pos
-    curr_pos = 0
-
-    def key_event(e):
-        global curr_pos
-
-        if e.key == "right":
-            curr_pos = curr_pos + 1
-        elif e.key == "left":
-            curr_pos = curr_pos - 1
-        else:
-            return
-        curr_pos = curr_pos % len(ts)
-
-        ax1.cla()
-        
-        arr = np.flip(ts[curr_pos], axis=0)
-        cset = ax1.contourf(X, Y, arr, 30, cmap=cm.RdYlBu)
-
-        plt.title('Depth = ' + str(round(ns2mm(z[curr_pos] / 2, velocity))) + ' mm')
-
-        # set axis labels
-        ax1.set_xlabel('Distance (m)')
-        ax1.set_ylabel('Distance (m)')
-
-        fig.canvas.draw()
-
-    fig, ax1 = plt.subplots(figsize = (21 / 2.54 / 2, 21 / 2 / 2.54 * (len(y) * distance_interval) / (len(x) * line_spacing)))
-
-    fig.canvas.mpl_connect('key_press_event', key_event)
-
+    titles = ['Depth = ' + str(round(ns2mm(i / 2, velocity))) + ' mm' for i in a.z]
+    viewer = SliceViewer(ts, x=a.x, y=a.y, titles=titles, cmap='RdYlBu', radargram=radargram)
     plt.show()
+    return(viewer)
 
 
 def plot_3d(a, depth, velocity):
@@ -1438,19 +1372,18 @@ def x2trace(distance, interval):
     return(trace)
 
 def traceidx(ndarray, start_trace, positive = True):
-    """Return a list of trace indices for an array.
+    """Return a numpy array of trace indices for an array.
     Attributes:
         arr <numpy.array>: An array of a GPR line segment;
         start_trace <int>: The index of the trace of the GPR line that the first trace of the input line segment corresponds to;
         positive <bool>: The direction of the line segment, positive (True) or negative (False).
     """
     a, t, pos = ndarray, start_trace, positive
-    n = lambda a: a.shape[1]
+    n = a.shape[1]
     if pos:
-        idx = [i for i in range(t, t + n(a))]
+        idx = np.arange(t, t + n)
     else:
-        a = np.flip(a, 1)
-        idx = [i for i in range(t, t - n(a), -1)]
+        idx = np.arange(t, t - n, -1)
     return(idx)
 
 def segments2line(segments):
@@ -1467,19 +1400,35 @@ def segments2line(segments):
 
     # create empty array
     y = min([i.shape[0] for i in a])
-    x = max(itertools.chain.from_iterable(idx)) + 1
+    x = max([i.max() for i in idx if i.size]) + 1
     ar = (np.zeros((y, x)))
 
-    # populate array with segment values
-    for i in [i for i in zip(a, idx)]:
-        for m, row in enumerate(i[0]):
-            if m < ar.shape[0]:
-                for n, col in enumerate(i[1]):
-                    if n < ar.shape[1]:
-                        ar[m][col] = i[0][m][n]
+    # populate array with whole segments; later segments overwrite earlier ones where they overlap
+    for arr, i in zip(a, idx):
+        ar[:, i] = arr[:y]
 
     return(ar)
 
+def segments2grid(lines, samples, traces, dtype=int, out=None):
+    """Combine the segments of many GPR lines into a single 3D array (lines x samples x traces) in one step.
+        Attributes:
+            lines <list>: A list of lines, each a list of segment tuples as input to 'segments2line';
+            samples <int>: The number of samples of the output grid; each line is clipped to the fewest samples of its segments and padded with zeros;
+            traces <int>: The number of traces of the output grid; traces falling outside the grid are discarded;
+            dtype <type>: The data type of the output array;
+            out <object>: An array or disk-backed store (e.g. 'cube.CubeStore') to write each line to instead of a new array in memory.
+    """
+    grid = np.zeros((len(lines), samples, traces), dtype=dtype) if out is None else out
+    for n, s in enumerate(lines):
+        line = np.zeros((samples, traces), dtype=dtype)
+        m = min([i[0].shape[0] for i in s] + [samples])
+        for a, t, d in s:
+            idx = traceidx(a, t, d)
+            ok = (idx >= 0) & (idx < traces)
+            line[:m, idx[ok]] = a[:m, ok]
+        grid[n] = line
+    return(grid)
+
 def subarraymean(ndarray, idx):
     """Return the mean of a 3-dimensional array as a 2-dimensional array
     Attributes:
@@ -1656,7 +1605,9 @@ class segments2array(object):
         ramac = [rd3(i) for i in spath]
 
         self.arr = [i.arr for i in ramac]
-        self.headers = [i.info for i in ramac]
+        self.headers = rad_table(spath)
+        if self.headers['mismatch'].any():
+            print('WARNING: segment parameters differ: ' + ', '.join(self.headers.loc[self.headers['mismatch'], 'path']))
 
         self.x = list(set(self.sx))
         self.x.sort()
@@ -1691,12 +1642,12 @@ class segments2array(object):
 
     def samples(self):
         """Return the average number of samples of the input line segments"""
-        s = int(round(pd.Series([i['SAMPLES'] for i in self.headers]).mean()))
+        s = int(round(self.headers['SAMPLES'].mean()))
         return(s)
 
     def time_interval(self):
-        """Return the average two-way time interval between samples of the input line segments. TThis method needs some way of checking whether the values are significantly different for cases where the input segments were measured using different measurement parameters."""
-        i = round(pd.Series([1 / i['FREQUENCY'] * 1000 for i in self.headers]).mean(), 5)
+        """Return the average two-way time interval between samples of the input line segments. Segments measured with different parameters are flagged in the 'mismatch' column of the header table."""
+        i = round((1000 / self.headers['FREQUENCY']).mean(), 5)
         return(i)
 
     def time(self):
@@ -1707,8 +1658,8 @@ class segments2array(object):
         return(labs)
 
     def distance_interval(self):
-        """Return the average distance interval between traces of the input line segments. This method needs some way of checking whether the values are significantly different for cases where the input segments were measured using different measurement parameters"""
-        i = float(round(pd.Series([i['DISTANCE INTERVAL'] for i in self.headers]).mean(), 6))
+        """Return the average distance interval between traces of the input line segments. Segments measured with different parameters are flagged in the 'mismatch' column of the header table."""
+        i = float(round(self.headers['DISTANCE INTERVAL'].mean(), 6))
         return(i)
 
     def distance(self):
@@ -1728,33 +1679,11 @@ class segments2array(object):
         return(idx)
 
     def build_array(self):
+        """Assemble the segments of every line into a single lines x samples x traces array clipped and padded to the grid."""
         idx = [self.lineidx(i) for i in self.x]
-        lines = []
-        for i in idx:
-            x = set([self.sx[j] for j in i]).pop()
-            print('Line x = ' + str(x))
-            a = [self.arr[j] for j in i]
-            t =  [x2trace(self.sy[j], self.distance_interval()) for j in i]
-            d = [self.sdir[j] for j in i]
-            s = [i for i in zip(a, t, d)]
-            line = segments2line(s)
-
-            line = line[0:self.samples(),:len(self.distance())] # clip to maximum sample and trace of grid length
-
-            dt = len(self.distance()) - line.shape[1]
-            z = np.array([int(0) for i in range(line.shape[0] * dt)]).reshape(line.shape[0], dt)
-            line = np.append(line, z, axis = 1) # add columns if line is short
-
-            # add rows if samples are short (not needed to implement as yet)
-            ds = self.samples() - line.shape[0]
-            if ds > 0:
-                z = np.array([[int(0) for j in range(line.shape[1])] for i in range(ds)])
-                line = np.append(line, z, axis = 0) # add rows if line is short
-
-            line = line.astype(int)
-            lines += [line]
-
-        stack = np.stack(lines)
+        dx = self.distance_interval()
+        lines = [[(self.arr[j], x2trace(self.sy[j], dx), self.sdir[j]) for j in i] for i in idx]
+        stack = segments2grid(lines, self.samples(), len(self.distance()))
         return(stack)
 
 
@@ -1,10 +1,12 @@
 
 """Graphical procedures for GPR data."""
 
+from collections import OrderedDict
 import numpy as np
 import math
 import matplotlib.pyplot as plt
-from matplotlib import cm
+from matplotlib import cm, colormaps
+from matplotlib.colors import Normalize
 
 from ...gis.raster import RectifyTif
 
@@ -148,7 +150,96 @@ class TimeSlice(RectifyTif):
  
 
 
-
-
-
-
+class SliceViewer:
+    """Browse the timeslices of a stack with the left and right arrow keys. Slices are converted to RGBA images when first shown and kept in a least-recently-used cache, and each key press only swaps the data of a single image artist and redraws it, the title and the optional radargram depth cursor with blitting.
+        Attributes:
+            slices <numpy.array>: a stack of timeslices (slices x rows x columns);
+            x <list>: the coordinates (m) of the columns; column numbers are used when None;
+            y <list>: the coordinates (m) of the rows, with the first row at the top; row numbers are used when None;
+            titles <list>: the title of each slice, e.g. its depth; slice numbers are used when None;
+            cmap <str>: the matplotlib colour map;
+            scale <str>: 'slice' scales the colours of each slice to its own range and 'global' to the range of the stack;
+            cache <int>: the number of RGBA images kept;
+            radargram <numpy.array>: a radargram (samples x traces) shown beside the slices with a cursor at the sample of the current slice;
+            samples <list>: the radargram sample of each slice; slice numbers are used when None.
+    """
+
+    def __init__(self, slices, x=None, y=None, titles=None, cmap='RdYlBu', scale='slice', cache=64, radargram=None, samples=None):
+        self.slices = slices
+        self.titles = titles if titles is not None else ['Slice ' + str(i) for i in range(len(slices))]
+        self.samples = samples if samples is not None else list(range(len(slices)))
+        self.cmap = colormaps[cmap] if isinstance(cmap, str) else cmap
+        self.norm = Normalize(np.nanmin(slices), np.nanmax(slices)) if scale == 'global' else None
+        self.size = cache
+        self.cache = OrderedDict()
+        self.position = 0
+        self.background = None
+
+        m, n = slices.shape[1:]
+        x = np.arange(n) if x is None else x
+        y = np.arange(m) if y is None else y
+        extent = (min(x), max(x), min(y), max(y))
+        cols = 2 if radargram is not None else 1
+        self.fig, axes = plt.subplots(1, cols, figsize=(21 / 2.54 / 2 * cols, 21 / 2 / 2.54))
+        self.ax = ax = np.atleast_1d(axes)[0]
+        self.image = ax.imshow(self.rgba(0), extent=extent, aspect='equal', interpolation='nearest', animated=True)
+        self.title = ax.set_title(self.titles[0], animated=True)
+        ax.set_xlabel('Distance (m)')
+        ax.set_ylabel('Distance (m)')
+        self.cursor = None
+        if radargram is not None:
+            ax2 = axes[1]
+            ax2.imshow(radargram, cmap='Greys_r', aspect='auto', interpolation='nearest')
+            ax2.set_xlabel('Traces')
+            ax2.set_ylabel('Samples')
+            self.cursor = ax2.axhline(self.samples[0], color='red', animated=True)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self.fig.canvas.mpl_connect('key_press_event', self._on_key)
+
+    def rgba(self, i):
+        """Return the cached RGBA image (rows x columns x 4, uint8) of a slice, creating it if necessary."""
+        if i in self.cache:
+            self.cache.move_to_end(i)
+            return(self.cache[i])
+        a = self.slices[i]
+        norm = self.norm if self.norm else Normalize(np.nanmin(a), np.nanmax(a))
+        img = self.cmap(norm(a), bytes=True)
+        self.cache[i] = img
+        if len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+        return(img)
+
+    def _artists(self):
+        """Return the artists that change between slices."""
+        return([i for i in [self.image, self.title, self.cursor] if i is not None])
+
+    def _on_draw(self, event):
+        """Keep the static background after a full redraw, e.g. on resizing, and draw the changing artists over it."""
+        c = self.fig.canvas
+        self.background = c.copy_from_bbox(self.fig.bbox)
+        for i in self._artists():
+            i.axes.draw_artist(i)
+
+    def _on_key(self, event):
+        """Show the next or previous slice."""
+        if event.key == 'right':
+            self.show(self.position + 1)
+        elif event.key == 'left':
+            self.show(self.position - 1)
+
+    def show(self, i):
+        """Show a slice, blitting only the changed artists onto the saved background."""
+        self.position = i = i % len(self.slices)
+        self.image.set_data(self.rgba(i))
+        self.title.set_text(self.titles[i])
+        if self.cursor is not None:
+            self.cursor.set_ydata([self.samples[i], self.samples[i]])
+        c = self.fig.canvas
+        if self.background is None:
+            c.draw_idle()
+            return
+        c.restore_region(self.background)
+        for a in self._artists():
+            a.axes.draw_artist(a)
+        c.blit(self.fig.bbox)
+        c.flush_events()
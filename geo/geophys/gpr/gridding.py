@@ -0,0 +1,103 @@
+"""Interpolate scattered GPR points onto a regular grid in-process.
+
+The points of every timeslice of a survey share the same positions and only their amplitudes change, so the neighbour search or triangulation is done once and stored as a fixed set of point indices and weights for each grid cell. Interpolating a slice, or a whole stack of slices, is then a single indexed weighted sum.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree, Delaunay
+
+
+def grid_axes(x, y, cell, bounds=None):
+    """Return the cell centre coordinates of a regular grid covering the points or the given bounds.
+        Attributes:
+            x <numpy.array>: x-coordinates of the points;
+            y <numpy.array>: y-coordinates of the points;
+            cell <float>: the cell size in the units of the coordinates;
+            bounds <tuple>: xmin, ymin, xmax and ymax of the grid; the extent of the points when None.
+    """
+    x0, y0, x1, y1 = bounds if bounds else (np.min(x), np.min(y), np.max(x), np.max(y))
+    gx = x0 + cell * np.arange(int(np.floor((x1 - x0) / cell + 1e-9)) + 1)
+    gy = y0 + cell * np.arange(int(np.floor((y1 - y0) / cell + 1e-9)) + 1)
+    return(gx, gy)
+
+def idw_weights(points, targets, k=8, power=2, radius=None):
+    """Return the indices and inverse distance weights of the k nearest points of every target; missing neighbours have the index len(points) and zero weight.
+        Attributes:
+            points <numpy.array>: an (n x 2) array of point coordinates;
+            targets <numpy.array>: an (m x 2) array of target coordinates;
+            k <int>: the number of neighbours;
+            power <float>: the power of the inverse distance;
+            radius <float>: the maximum distance of a neighbour; unlimited when None.
+    """
+    k = min(k, len(points))
+    d, idx = cKDTree(points).query(targets, k=k, distance_upper_bound=np.inf if radius is None else radius)
+    d, idx = d.reshape(len(targets), k), idx.reshape(len(targets), k)
+    with np.errstate(divide='ignore'):
+        w = np.where(np.isfinite(d), 1 / d ** power, 0)
+    exact = d[:, 0] == 0
+    w[exact] = 0
+    w[exact, 0] = 1
+    return(idx, w)
+
+def linear_weights(points, targets):
+    """Return the indices and barycentric weights of the vertices of the Delaunay triangle containing every target; targets outside the triangulation have the index len(points) and zero weight.
+        Attributes:
+            points <numpy.array>: an (n x 2) array of point coordinates;
+            targets <numpy.array>: an (m x 2) array of target coordinates.
+    """
+    tri = Delaunay(points)
+    s = tri.find_simplex(targets)
+    T = tri.transform[s]
+    b = np.einsum('ijk,ik->ij', T[:, :2], targets - T[:, 2])
+    w = np.column_stack([b, 1 - b.sum(axis=1)])
+    idx = tri.simplices[s]
+    outside = s < 0
+    idx[outside] = len(points)
+    w[outside] = 0
+    return(idx, w)
+
+
+class Gridder:
+    """Interpolate values at fixed scattered points, such as the traces of the lines of a grid, onto a regular grid; the interpolation weights are calculated once and reused for every set of values.
+        Attributes:
+            x <numpy.array>: x-coordinates of the points;
+            y <numpy.array>: y-coordinates of the points;
+            cell <float>: the cell size of the grid;
+            method <str>: 'linear' (Delaunay triangulation), 'idw' (inverse distance weighting) or 'nearest';
+            bounds <tuple>: xmin, ymin, xmax and ymax of the grid; the extent of the points when None;
+            k <int>: the number of neighbours of 'idw';
+            power <float>: the power of the inverse distance of 'idw';
+            radius <float>: the maximum distance of a neighbour for 'idw' and 'nearest'; cells without neighbours are NaN.
+    """
+
+    def __init__(self, x, y, cell=0.05, method='linear', bounds=None, k=8, power=2, radius=None):
+        p = np.column_stack([np.ravel(x), np.ravel(y)]).astype(float)
+        self.x, self.y = grid_axes(p[:,0], p[:,1], cell, bounds)
+        self.cell = cell
+        self.method = method
+        self.shape = (len(self.y), len(self.x))
+        gx, gy = np.meshgrid(self.x, self.y)
+        t = np.column_stack([gx.ravel(), gy.ravel()])
+        if method == 'linear':
+            self.idx, self.weights = linear_weights(p, t)
+        elif method == 'idw':
+            self.idx, self.weights = idw_weights(p, t, k, power, radius)
+        elif method == 'nearest':
+            self.idx, self.weights = idw_weights(p, t, 1, power, radius)
+        else:
+            raise ValueError("Method must be 'linear', 'idw' or 'nearest'.")
+        self.n = len(p)
+
+    def __call__(self, values):
+        """Return the gridded values (y x x) of one set of point values, or a stack (slices x y x x) of an array of sets (slices x points). NaN values are ignored and the remaining weights renormalised."""
+        v = np.asarray(values, dtype=float)
+        if v.shape[-1] != self.n:
+            raise ValueError('Expected ' + str(self.n) + ' values per slice, not ' + str(v.shape[-1]) + '.')
+        pad = np.full(v.shape[:-1] + (1,), np.nan)
+        v = np.concatenate([v, pad], axis=-1)[..., self.idx]
+        valid = ~np.isnan(v)
+        w = np.where(valid, self.weights, 0)
+        total = w.sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g = np.where(total > 0, (np.where(valid, v, 0) * w).sum(axis=-1) / total, np.nan)
+        return(g.reshape(v.shape[:-2] + self.shape))
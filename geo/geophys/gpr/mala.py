@@ -1,13 +1,17 @@
 
 """Extract data from MALA file types and output into useful formats."""
 
-#from os.path import splitext
-from numpy import fromstring
+from os import stat
+from os.path import getsize, isfile, splitext
+from concurrent.futures import ThreadPoolExecutor
+from numpy import fromfile
 import numpy as np
-from collections import namedtuple
+import pandas as pd
+from collections import OrderedDict
 
 from .filesystem import get_file_path
-from .calculations import distance, time
+from .calculations import Axis
+from .preview import preview_levels, read_preview, write_preview
 from .graph import RadarGram
 
 
@@ -16,33 +20,96 @@ def file_extensions():
     extension_list = ['.cor', '.mrk', '.rad', '.rd3']
     return(extension_list)
 
-def rad2dict(path):
+def _rad_value(value):
+    """Return a RAD header value as an integer or float where possible, otherwise as a string."""
+    try:
+        return(float(value) if '.' in value else int(value))
+    except ValueError:
+        return(value)
+
+def rad2dict(path, index=None, raw=False):
     """Return line header information as a dictionary.
            Attributes:
                 rad <string>: Full path to MALA '.rad' or '.RAD' file;
+                index <SurveyIndex>: An optional survey index used to find the file;
+                raw <bool>: with True the values are kept as written and the fields in file order.
     """
-    p = get_file_path(path, ext='.rad')
-    try:
-        f = open(p, 'r')
-        d = {}
-        for line in f.readlines():
-            text = line.split(':')
-            key = text[0]
-            value = text[1].strip()
-            try:
-                if '.' in value:
-                    value = float(value)
-                else:
-                    value = int(value)
-            except:
-                pass
-            d[key] = value
-        f.close()
-        return(d)
+    p = get_file_path(path, ext='.rad', index=index)
+    with open(p, 'r') as f:
+        lines = [i.split(':', 1) for i in f.read().splitlines() if ':' in i]
+    if raw:
+        return(OrderedDict([(k, v.strip()) for k, v in lines]))
+    d = {k: _rad_value(v.strip()) for k, v in lines}
+    return(d)
+
+# header fields that must agree between the segments of a grid
+GRID_FIELDS = ['SAMPLES', 'FREQUENCY', 'DISTANCE INTERVAL', 'ANTENNAS']
+
+def _rad_row(path):
+    """Return the header of a RAD file with its path, size and modification time as a dictionary; only the path is returned if the file is missing."""
+    d = {'rad_path': path}
+    if path and isfile(path):
+        st = stat(path)
+        d.update({'size': st.st_size, 'mtime': st.st_mtime_ns})
+        d.update(rad2dict(path))
+    return(d)
+
+def header_mismatch(table, fields=GRID_FIELDS, rtol=1e-6):
+    """Return a boolean dataframe flagging, for each segment and field, header values that differ from the most common value of the field.
+        Attributes:
+            table <pandas.DataFrame>: A table of RAD headers from 'rad_table';
+            fields <list>: The header fields to compare;
+            rtol <float>: The relative tolerance of numeric comparisons.
+    """
+    df = pd.DataFrame(False, index=table.index, columns=[i for i in fields if i in table])
+    for i in df.columns:
+        c = table[i]
+        if c.notna().any():
+            ref = c.mode().iloc[0]
+            if pd.api.types.is_numeric_dtype(c):
+                df[i] = ~np.isclose(c, ref, rtol=rtol)
+            else:
+                df[i] = c != ref
+    return(df)
+
+def rad_table(paths, cache=None, threads=None, index=None):
+    """Return a dataframe of the RAD headers of many segments with one row per path. Headers are read concurrently in a thread pool and columns are converted to numbers where possible. A 'mismatch' column flags segments whose grid parameters differ from the rest (see 'header_mismatch').
+        Attributes:
+            paths <list>: filesystem paths of MALA files with or without an extension;
+            cache <str>: path of a CSV file keeping the table, e.g. in the survey directory; only files that are new or have changed since it was written are read;
+            threads <int>: the maximum number of threads;
+            index <SurveyIndex>: An optional survey index used to find the files.
+    """
+    rads = [get_file_path(i, ext='.rad', index=index) for i in paths]
+    cached = {}
+    if cache and isfile(cache):
+        c = pd.read_csv(cache, dtype={'size': 'Int64', 'mtime': 'Int64'})
+        cached = {r['rad_path']: r for r in c.to_dict('records')}
+
+    def row(p):
+        r = cached.get(p)
+        if r is not None and isfile(p):
+            st = stat(p)
+            if (r['size'], r['mtime']) == (st.st_size, st.st_mtime_ns):
+                return(r)
+        return(_rad_row(p))
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        rows = list(ex.map(row, rads))
+    df = pd.DataFrame(rows)
+    for i in ['size', 'mtime']:
+        df[i] = pd.array([r.get(i) for r in rows], dtype='Int64') # file times in ns exceed float precision
+    for i in df.select_dtypes(include=object).columns:
+        try:
+            df[i] = pd.to_numeric(df[i])
+        except (ValueError, TypeError):
+            pass
+    if cache:
+        df.to_csv(cache, index=False)
+    df.insert(0, 'path', list(paths))
+    df['mismatch'] = header_mismatch(df).any(axis=1)
+    return(df)
 
-    except Exception as e:
-        print(e)
- 
 def rd32arr(path, samples):
     """Read a MALA RD3 file into a numpy array.
         Attributes:
@@ -52,7 +119,7 @@ def rd32arr(path, samples):
             Errors have previously been found in the trace number in the DAT files, therefore it is calculated here from the sample number. Metadata would therefore need to be updated for a returned array.
     """
     with open(path, 'rb') as f:
-        s = fromstring(f.read(), dtype = 'int16')
+        s = fromfile(f, dtype = 'int16')
         length = s.shape[0]
         traces = round(length / samples)
     try:
@@ -62,21 +129,150 @@ def rd32arr(path, samples):
         print(e)
         print(path)
 
+def rd3memmap(path, samples, mode='r'):
+    """Return a memory-mapped samples x traces view of a MALA RD3 file. No data is read until the view is sliced.
+        Attributes:
+            path <str>: filesystem path to a MALA RD3 file;
+            samples <int>: The number of samples per trace read from a MALA RAD file;
+            mode <str>: numpy.memmap mode; 'r' (read-only), 'r+' (read-write) or 'c' (copy-on-write).
+        Note:
+            As in 'rd32arr' the trace number is calculated from the file size; an incomplete final trace is ignored.
+    """
+    traces = getsize(path) // 2 // samples
+    if traces == 0:
+        return(np.zeros((samples, 0), dtype='int16'))
+    m = np.memmap(path, dtype='int16', mode=mode, shape=(traces, samples))
+    return(m.T)
+
+def rd3window(path, samples, traces=None, window=None):
+    """Read a range of traces and a window of samples from a MALA RD3 file into a numpy array. Traces are stored contiguously so only the bytes of the requested trace range are read from disk.
+        Attributes:
+            path <str>: filesystem path to a MALA RD3 file;
+            samples <int>: The number of samples per trace read from a MALA RAD file;
+            traces <tuple>: The first and last (exclusive) trace index; None returns all traces;
+            window <tuple>: The first and last (exclusive) sample index; None returns all samples.
+    """
+    m = rd3memmap(path, samples)
+    t = slice(*traces) if traces else slice(None)
+    w = slice(*window) if window else slice(None)
+    arr = np.array(m[w, t])
+    return(arr)
+
 def arr2rd3(array, path):
-    """"""
-    a = np.concatenate([i for i in array.T])
-    with open(path, 'wb') as f:
-        for i in a:
-            f.write(i)
+    """Write a samples x traces array to a MALA RD3 file as trace-major int16 in a single write.
+        Attributes:
+            array <numpy.array>: A radargram array (samples x traces);
+            path <str>: filesystem path of the output RD3 file.
+    """
+    a = np.ascontiguousarray(array.T, dtype='int16')
+    a.tofile(path)
+
+def rad_header(metadata, source=None, **kwargs):
+    """Return an ordered dictionary of MALA RAD header fields from a metadata object such as RAD.
+        Attributes:
+            metadata <object>: An object with 'samples', 'frequency', 'step', 'traces' and optionally 'start_position' and 'system_calibration' attributes;
+            source <dict>: the header of the source file (e.g. from 'rad2dict' with raw=True); its fields are kept and only the samples, traces, time window and start and stop positions are replaced;
+            kwargs: values overriding the attributes of the metadata object (e.g. traces=1000).
+    """
+    get = lambda k, d=None: kwargs.get(k, getattr(metadata, k, d))
+    samples, frequency, step, traces = [get(i) for i in ['samples', 'frequency', 'step', 'traces']]
+    start = get('start_position', 0)
+    stop = start + (traces - 1) * step
+    d = OrderedDict([
+        ('SAMPLES', samples),
+        ('FREQUENCY', frequency),
+        ('FREQUENCY STEPS', 1),
+        ('SIGNAL POSITION', 0),
+        ('RAW SIGNAL POSITION', 0),
+        ('DISTANCE FLAG', 1),
+        ('TIME FLAG', 0),
+        ('PROGRAM FLAG', 0),
+        ('EXTERNAL FLAG', 0),
+        ('TIME INTERVAL', 0),
+        ('DISTANCE INTERVAL', step),
+        ('OPERATOR', ''),
+        ('CUSTOMER', ''),
+        ('SITE', ''),
+        ('ANTENNAS', get('antennas', 500)),
+        ('ANTENNA ORIENTATION', ''),
+        ('ANTENNA SEPARATION', get('antenna_separation', 0.18)),
+        ('COMMENT', ''),
+        ('TIMEWINDOW', str.format('{0:.4f}', samples / frequency * 1000)),
+        ('STACKS', 1),
+        ('STACK EXPONENT', 1),
+        ('STACKING TIME', 0),
+        ('LAST TRACE', traces),
+        ('STOP POSITION', str.format('{0:.6f}', stop)),
+        ('SYSTEM CALIBRATION', str.format('{0:.10f}', get('system_calibration', 0))),
+        ('START POSITION', str.format('{0:.6f}', start)),
+    ])
+    if source:
+        s = OrderedDict(source)
+        s.update([(k, d[k]) for k in ['SAMPLES', 'TIMEWINDOW', 'LAST TRACE', 'STOP POSITION', 'START POSITION']])
+        d = s
+    return(d)
+
+def write_rad(header, path):
+    """Write a dictionary of header fields to a MALA RAD file.
+        Attributes:
+            header <dict>: RAD header fields, e.g. from 'rad_header';
+            path <str>: filesystem path of the output RAD file.
+    """
+    with open(path, 'w', newline='') as f:
+        f.write(''.join([k + ':' + str(v) + '\r\n' for k, v in header.items()]))
+
+
+class RD3Writer:
+    """Stream traces to a MALA RD3 file as they are produced and write the RAD header on closing, so that long lines never need to be held in memory as a whole.
+        Attributes:
+            path <str>: filesystem path of the output file with or without an extension;
+            metadata <object>: An object with RAD metadata attributes as used by 'rad_header';
+            kwargs: values overriding the attributes of the metadata object; 'traces' is always set from the traces written.
+    """
+
+    def __init__(self, path, metadata, **kwargs):
+        b, e = splitext(path)
+        self.rd3_path = b + '.rd3'
+        self.rad_path = b + '.rad'
+        self.metadata = metadata
+        self.kwargs = kwargs
+        self.samples = kwargs.get('samples', metadata.samples)
+        self.traces = 0
+        self._file = open(self.rd3_path, 'wb')
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, array):
+        """Append the traces of a samples x traces array (or a single trace) to the RD3 file."""
+        a = np.asarray(array)
+        a = a.reshape(-1, 1) if a.ndim == 1 else a
+        if a.shape[0] != self.samples:
+            raise ValueError('Traces have ' + str(a.shape[0]) + ' samples; expected ' + str(self.samples) + '.')
+        np.ascontiguousarray(a.T, dtype='int16').tofile(self._file)
+        self.traces += a.shape[1]
+
+    def close(self):
+        """Close the RD3 file and write the RAD header."""
+        if self._file.closed:
+            return
+        self._file.close()
+        k = dict(self.kwargs, traces=self.traces)
+        p = getattr(self.metadata, 'rad_path', None)
+        source = rad2dict(p, raw=True) if p else None
+        write_rad(rad_header(self.metadata, source, **k), self.rad_path)
 
 
 class RAD:
     """From MALA RD3 header data, create an object with custom metadata of a GPR segment."""
 
-    def __init__(self, path):
-        """Read a RAD FILE and set attributes using the file content."""
-        p = get_file_path(path, ext='.rad')
-        d = rad2dict(p)
+    def __init__(self, path, index=None):
+        """Read a RAD FILE and set attributes using the file content; files are found from a survey index if given."""
+        p = get_file_path(path, ext='.rad', index=index)
+        d = rad2dict(p, index)
 
         s = self
         s.format = 'MALA'
@@ -87,26 +283,20 @@ class RAD:
         s.start_position = d['START POSITION']
         s.system_calibration = d['SYSTEM CALIBRATION']
 
-        values = self._x_values()
-        precision = 4
-        X = namedtuple('x', ['values', 'precision'])
-        s.x = X(values, precision)
-
-        values = self._y_values()
-        precision = 7
-        Y = namedtuple('y', ['values', 'precision'])
-        s.y = Y(values, precision)
+        s.x = self._x_values()
+        s.y = self._y_values()
 
         s.rad_path = p
 
     def _x_values(self):
-        """Calculate the trace x coordinates from the metadata."""
-        x = distance(self.step, self.traces)
+        """Return the axis of trace x coordinates (m) from the metadata, rounded as by 'calculations.distance'."""
+        x = Axis(0, self.step, self.traces, 7)
         return(x)
 
     def _y_values(self):
-        """Calculate the trace y coordinates from the metadata."""
-        y = time(self.frequency, self.samples, precision=5)
+        """Return the axis of sample y coordinates (two-way time, ns) from the metadata, rounded as by 'calculations.time'."""
+        interval = 1 / self.frequency * 1000
+        y = Axis(interval, interval, self.samples, 5)
         return(y)
 
 
@@ -115,31 +305,64 @@ class RD3(RAD):
 
     ext = 'rd3'
 
-    def __init__(self, path, rad_path=None):
+    def __init__(self, path, rad_path=None, mmap=False, index=None, lazy=False, preview=False):
+        """Read the array into memory, or with 'mmap' as a read-only memory-mapped view of the file. With 'lazy' only the header is read, the trace number is taken from the file size and the array is left to 'read'. With 'preview' the preview pyramid is built while the array is in memory if it is missing or out of date."""
         rad_path = rad_path if rad_path else path
-        RAD.__init__(self, rad_path)
-        p = get_file_path(path, ext='.rd3')
-        self.array = rd32arr(p, self.samples)
-        self._update_traces()
+        RAD.__init__(self, rad_path, index)
+        p = get_file_path(path, ext='.rd3', index=index)
         self.rd3_path = p
+        if lazy:
+            self.traces = getsize(p) // 2 // self.samples
+            self.x = self._x_values()
+            return
+        self.array = rd3memmap(p, self.samples) if mmap else self.read()
+        self._update_traces()
+        if preview:
+            self.preview()
+
+    def read(self):
+        """Read and return the array of the RD3 file."""
+        return(rd32arr(self.rd3_path, self.samples))
+
+    def window(self, traces=None, window=None):
+        """Return a range of traces and a window of samples of the array; a view without copying when the array is memory-mapped.
+            Attributes:
+                traces <tuple>: The first and last (exclusive) trace index; None returns all traces;
+                window <tuple>: The first and last (exclusive) sample index; None returns all samples.
+        """
+        t = slice(*traces) if traces else slice(None)
+        w = slice(*window) if window else slice(None)
+        return(self.array[w, t])
+
+    def preview(self, factor=4, size=64):
+        """Return the preview levels of the array (see 'preview.preview_levels') from the '.preview.npz' sidecar of the RD3 file, building and saving them if the sidecar is missing or out of date."""
+        levels = read_preview(self.rd3_path)
+        if levels is None:
+            a = self.array if hasattr(self, 'array') else rd3memmap(self.rd3_path, self.samples)
+            levels = preview_levels(a, factor, size)
+            write_preview(self.rd3_path, levels)
+        return(levels)
 
     def _update_traces(self):
         """The trace number recorded in some DAT files has been found to occasionally be in error. The returned array is used here to update the metadata"""
         self.traces = self.array.shape[1]
+        self.x = self._x_values()
 
     def write_array(self, path):
-        """Write rd3 to file"""
-        #b, e = splitext(path)
-        #arr2rd3(b + '.rd3', self.traces, self.samples)
+        """Write the array and its RAD header to file; the header of the source file is kept apart from the samples, traces, time window and positions."""
+        b, e = splitext(path)
+        arr2rd3(self.array, b + '.rd3')
+        source = rad2dict(self.rad_path, raw=True)
+        write_rad(rad_header(self, source, traces=self.array.shape[1]), b + '.rad')
 
 
 class Line(RadarGram):
     """A line object"""
-    def __init__(self, m, n):
-        """"""
+    def __init__(self, m, n, x=None, y=None):
+        """Create an empty line of m samples and n traces with trace and sample axes ('calculations.Axis'); trace and sample numbers are used when the axes are None."""
         self.array = self._empty_array(m, n)
-        self.x = n
-        self.y = m
+        self.x = x if x is not None else Axis(0, 1, n, 0)
+        self.y = y if y is not None else Axis(0, 1, m, 0)
 
     def _empty_array(self, m, n):
         """Return an empty array"""
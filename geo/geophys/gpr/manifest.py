@@ -0,0 +1,110 @@
+"""Track the inputs of GPR outputs so that a survey can be rebuilt incrementally.
+
+Each line of a grid is identified by a digest of the content of its data files and of its metadata row (e.g. corrected coordinates). Every output, such as a line of a cube, a timeslice or an image, records the digests of the lines it was built from. On a re-run only the outputs with a changed, added or removed line, or a missing file, are rebuilt and the rest are reported as reused.
+"""
+
+import json
+from hashlib import blake2b
+from os import stat
+from os.path import isfile
+
+
+def file_digest(path, block=2 ** 20):
+    """Return the hexadecimal blake2b digest of the content of a file, read in blocks."""
+    h = blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for b in iter(lambda: f.read(block), b''):
+            h.update(b)
+    return(h.hexdigest())
+
+def row_digest(row):
+    """Return the hexadecimal blake2b digest of a metadata row (a pandas series or dictionary); values are compared as strings."""
+    d = row.to_dict() if hasattr(row, 'to_dict') else dict(row)
+    text = json.dumps({str(k): str(v) for k, v in d.items()}, sort_keys=True)
+    return(blake2b(text.encode(), digest_size=16).hexdigest())
+
+
+class Manifest:
+    """A JSON record of the line digests of the last build and of the line digests each output was built from.
+        Attributes:
+            path <str>: filesystem path of the JSON manifest; it is created on 'save'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        d = {}
+        if isfile(path):
+            with open(path, 'r') as f:
+                d = json.load(f)
+        self.previous = d.get('lines', {}) # line: digest of the last build
+        self.outputs = d.get('outputs', {}) # output: {line: digest}
+        self.files = d.get('files', {}) # path: [size, mtime, digest]
+        self.lines = {} # line: digest of this build
+        self.rebuilt = []
+        self.reused = []
+
+    def _file(self, path):
+        """Return the digest of a file, hashing its content only if its size or modification time has changed."""
+        st = stat(path)
+        s = self.files.get(path)
+        if s and s[:2] == [st.st_size, st.st_mtime_ns]:
+            return(s[2])
+        h = file_digest(path)
+        self.files[path] = [st.st_size, st.st_mtime_ns, h]
+        return(h)
+
+    def track(self, line, paths=(), row=None):
+        """Register a line from its data files and metadata row and return its digest.
+            Attributes:
+                line <str>: a unique name of the line, e.g. its id;
+                paths <list>: filesystem paths of the data files of the line (e.g. the '.rd3' and '.rad' files);
+                row <pandas.Series>: the metadata row of the line.
+        """
+        h = blake2b(digest_size=16)
+        for p in paths:
+            h.update(self._file(p).encode())
+        if row is not None:
+            h.update(row_digest(row).encode())
+        self.lines[str(line)] = d = h.hexdigest()
+        return(d)
+
+    def changed(self):
+        """Return the lines that were added or whose digest changed since the last build, and the lines that were removed."""
+        new = [i for i, d in self.lines.items() if self.previous.get(i) != d]
+        removed = [i for i in self.previous if i not in self.lines]
+        return(new, removed)
+
+    def stale(self, output, lines, path=None):
+        """Return True if an output must be rebuilt because it is new, its lines have changed or its file is missing.
+            Attributes:
+                output <str>: a unique name of the output, e.g. 'cube/line/3' or an image path;
+                lines <list>: the lines the output is built from;
+                path <str>: the file of the output, if any; a missing file makes the output stale.
+        """
+        if path and not isfile(path):
+            return(True)
+        return(self.outputs.get(output) != {str(i): self.lines[str(i)] for i in lines})
+
+    def build(self, output, lines, func, *args, path=None, **kwargs):
+        """Call 'func' with any further arguments to build an output if it is stale, record its lines and return True if it was rebuilt; otherwise record it as reused and return False."""
+        if not self.stale(output, lines, path):
+            self.reused.append(output)
+            return(False)
+        func(*args, **kwargs)
+        self.outputs[output] = {str(i): self.lines[str(i)] for i in lines}
+        self.rebuilt.append(output)
+        return(True)
+
+    def report(self):
+        """Return a dictionary listing the changed and removed lines and the rebuilt and reused outputs of this build, and print a summary."""
+        new, removed = self.changed()
+        r = {'changed': new, 'removed': removed, 'rebuilt': self.rebuilt, 'reused': self.reused}
+        print(str.format('{0} lines changed, {1} removed; {2} outputs rebuilt, {3} reused', len(new), len(removed), len(self.rebuilt), len(self.reused)))
+        return(r)
+
+    def save(self):
+        """Write the line digests of this build and the outputs to the manifest, dropping outputs of removed lines."""
+        outputs = {k: v for k, v in self.outputs.items() if all(i in self.lines for i in v)}
+        d = {'lines': self.lines, 'outputs': outputs, 'files': self.files}
+        with open(self.path, 'w') as f:
+            json.dump(d, f, indent=1)
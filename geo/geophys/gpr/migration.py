@@ -0,0 +1,120 @@
+"""Migrate GPR radargrams and grids to collapse diffraction hyperbolae.
+
+Arrays are radargrams (samples x traces) or grids (lines x samples x traces) with time zero at the first sample. Velocities are the subsurface radar velocity (m/ns); the exploding-reflector velocity (half the radar velocity) is used internally for two-way times.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+def stolt(array, dx, dt, velocity, dy=None, pad=2):
+    """Return a constant-velocity Stolt (f-k) migration of a radargram or a grid.
+        Attributes:
+            array <numpy.array>: A radargram (samples x traces) or grid (lines x samples x traces);
+            dx <float>: the distance (m) between traces;
+            dt <float>: the time interval (ns) between samples;
+            velocity <float>: the radar velocity (m/ns);
+            dy <float>: the distance (m) between lines; required for a grid, which is migrated in 3D;
+            pad <int>: the factor by which the time axis is zero-padded to limit wrap-around.
+    """
+    a = np.asarray(array, dtype=float)
+    nt, nx = a.shape[-2:]
+    nf = pad * nt
+    axes = (0, -1) if a.ndim > 2 else (-1,)
+    D = np.fft.fftn(np.fft.fft(a, n=nf, axis=-2), axes=axes)
+
+    f = np.fft.fftfreq(nf, dt)[:, None]
+    k2 = np.fft.fftfreq(nx, dx)[None, :] ** 2
+    if a.ndim > 2:
+        ky = np.fft.fftfreq(a.shape[0], dy)
+        f = f[None]
+        k2 = k2[None] + ky[:, None, None] ** 2
+    ve = velocity / 2
+
+    # map each output frequency to the input frequency of the dispersion relation and interpolate linearly
+    fin = np.sign(f) * np.sqrt(f ** 2 + ve ** 2 * k2)
+    df = 1 / (nf * dt)
+    idx = fin / df
+    i0 = np.floor(idx)
+    w = idx - i0
+    i0 = np.broadcast_to(i0.astype(int) % nf, D.shape)
+    i1 = (i0 + 1) % nf
+    w = np.broadcast_to(w, D.shape)
+    scale = np.divide(f, fin, out=np.zeros(fin.shape), where=fin != 0)
+    scale = np.where(np.abs(fin) < (nf // 2) * df, scale, 0)
+    M = (np.take_along_axis(D, i0, -2) * (1 - w) + np.take_along_axis(D, i1, -2) * w) * scale
+
+    m = np.fft.ifft(np.fft.ifftn(M, axes=axes), axis=-2).real[..., :nt, :]
+    return(m)
+
+def kirchhoff_traces(array, dx, dt, velocity, first, last, aperture=None):
+    """Return the Kirchhoff migration (samples x traces) of a range of output traces of a radargram by summing amplitudes along diffraction hyperbolae.
+        Attributes:
+            array <numpy.array>: A radargram (samples x traces);
+            dx <float>: the distance (m) between traces;
+            dt <float>: the time interval (ns) between samples;
+            velocity <float>: the radar velocity (m/ns);
+            first <int>: the first output trace;
+            last <int>: the last output trace (exclusive);
+            aperture <int>: the half-width (traces) of the summation; all traces when None.
+    """
+    a = np.asarray(array, dtype=float)
+    nt, nx = a.shape
+    A = nx if aperture is None else aperture
+    tau = np.arange(nt) * dt
+    x0 = np.arange(first, last)
+    out = np.zeros((nt, len(x0)))
+    for h in range(-A, A + 1):
+        x = x0 + h
+        ok = (x >= 0) & (x < nx)
+        if not ok.any():
+            continue
+        t = np.sqrt(tau ** 2 + (2 * h * dx / velocity) ** 2)
+        ti = t / dt
+        i0 = np.floor(ti).astype(int)
+        w = ti - i0
+        valid = i0 < nt - 1
+        i0, w = i0[valid], w[valid]
+        weight = np.divide(tau[valid], t[valid], out=np.ones(i0.shape), where=t[valid] > 0)
+        cols = x[ok]
+        s = a[i0][:, cols] * (1 - w)[:, None] + a[i0 + 1][:, cols] * w[:, None]
+        out[np.flatnonzero(valid)[:, None], np.flatnonzero(ok)[None, :]] += s * weight[:, None]
+    return(out)
+
+def _kirchhoff(args):
+    """Unpack the arguments of 'kirchhoff_traces' for a process pool."""
+    return(kirchhoff_traces(*args))
+
+def kirchhoff(array, dx, dt, velocity, aperture=None, chunk=64, processes=1):
+    """Return a Kirchhoff migration of a radargram or grid, computed in chunks of output traces that can be shared between processes. Grids are migrated line by line.
+        Attributes:
+            array <numpy.array>: A radargram (samples x traces) or grid (lines x samples x traces);
+            dx <float>: the distance (m) between traces;
+            dt <float>: the time interval (ns) between samples;
+            velocity <float>: the radar velocity (m/ns);
+            aperture <int>: the half-width (traces) of the summation; all traces when None;
+            chunk <int>: the number of output traces of each task;
+            processes <int>: the number of worker processes; computation is serial when 1 and uses all processors when None.
+    """
+    a = np.asarray(array, dtype=float)
+    lines = a.reshape((-1,) + a.shape[-2:])
+    nx = a.shape[-1]
+    tasks = [(i, j) for i in range(len(lines)) for j in range(0, nx, chunk)]
+    args = [(lines[i], dx, dt, velocity, j, min(j + chunk, nx), aperture) for i, j in tasks]
+    if processes == 1:
+        res = [_kirchhoff(i) for i in args]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as ex:
+            res = list(ex.map(_kirchhoff, args))
+    out = np.zeros(lines.shape)
+    for (i, j), r in zip(tasks, res):
+        out[i, :, j:j + r.shape[1]] = r
+    return(out.reshape(a.shape))
+
+def migrate(array, dx, dt, velocity, dy=None, method='stolt', **kwargs):
+    """Migrate a radargram or grid with the 'stolt' or 'kirchhoff' method; further keyword arguments are passed to the method."""
+    if method == 'stolt':
+        return(stolt(array, dx, dt, velocity, dy=dy, **kwargs))
+    elif method == 'kirchhoff':
+        return(kirchhoff(array, dx, dt, velocity, **kwargs))
+    raise ValueError("Method must be 'stolt' or 'kirchhoff'.")
@@ -8,6 +8,8 @@ from os.path import join
 import numpy as np
 
 from .gpr import MetaData, list_an_attribute, equal_list_elements as eqlst, RadarGram, TimeSlice, ns2mm
+from .alignment import offsets
+from .migration import migrate
 
 class Geometry(MetaData):
     def __init__(self, path):
@@ -149,16 +151,16 @@ class AlignRadarGrams:
 class FillRadarGrams:
     def __init__(self, clip=None):
         """Fill radargrams with zeros to maximum and minimum x"""
+        self.step = eqlst([i.step for i in self.lines])
         self.x = self._x()
         [self.update_x(i) for i in self.lines]
 
     def update_x(self, line):
         """Update the x-values for each listed line object"""
-        x = self.x
-        idx0 = x.index(min(line.x))
-        idx1 = x.index(max(line.x)) + 1
+        idx0 = offsets([min(line.x)], self.x[0], self.step)[0]
+        idx1 = idx0 + line.array.shape[1]
 
-        m, n = len(line.y), len(x)
+        m, n = len(line.y), len(self.x)
         arr = np.zeros((m, n))
         arr[:,idx0:idx1] = line.array
         line.array = arr
@@ -167,7 +169,7 @@ class FillRadarGrams:
         """Get the minimum and maximum x-values"""
         x0 = min([min(i.x) for i in self.lines])
         x1 = max([max(i.x) for i in self.lines])
-        step = eqlst([i.step for i in self.lines])
+        step = self.step
         traces = round((x1 - x0) / step + 1)
         x = [round(x0 + i * step, 4) for i in range(traces)]
         return(x)
@@ -219,6 +221,14 @@ class StackLines(AdjustGrid, AlignRadarGrams, FillRadarGrams, TimeSlice):
         #a = np.rot90(a, axes = (1,2))
         return(a)
 
+    def migrate(self, method='stolt', **kwargs):
+        """Return the array migrated with the line velocity, trace step and line spacing; see 'migration.migrate' for methods and arguments."""
+        a = np.moveaxis(self.array, 0, 1) # lines x samples x traces
+        dt = self.z[1] - self.z[0]
+        dy = abs(self.y[1] - self.y[0]) if len(self.y) > 1 else None
+        a = migrate(a, self.step, dt, self.velocity, dy=dy, method=method, **kwargs)
+        return(np.moveaxis(a, 1, 0))
+
     def geometry(self):
         """Return a list of coordinate tuples representing the nodes of each line."""
         from shapely.geometry import LineString, MultiLineString, Point
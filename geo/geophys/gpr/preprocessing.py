@@ -7,9 +7,9 @@ import math
 from collections import Counter
 
 from .gpr import MetaData, x_flip, empty_array
-from .mala import rad2dict, RD3, arr2rd3, Line
+from .mala import rad2dict, RD3, arr2rd3, rad_header, write_rad, Line
 from .filesystem import list_gpr_data, get_folder_and_filename
-from .calculations import ns2mm
+from .render import render_radargrams
 
 
 class Coordinates(MetaData):
@@ -341,59 +341,26 @@ class ParallelGrid(MetaData):
         for l, n in zip(self.lines, name_list):
             l.filename = n
 
-    def radargrams(self, directory, time=True, distance=True, depth=True):
-        """Output jpg radargrams."""
-        d = directory
-        for i in self.lines:
-            i.plot()
-            if distance:
-                i.x_axis(self.distance_coords)
-            if time:
-                i.y_axis(self.time)
-            if depth:
-                i.y2_axis([round(ns2mm(i, 0.1) / 1000, 3) for i in self.time])
-            path = join(d, i.filename + '.jpg')
-            if not isfile(path):
-                i.jpg(path)
-            i.close()
+    def radargrams(self, directory, time=True, distance=True, depth=True, processes=None):
+        """Output jpg radargrams in parallel and return the path and render time (s) of each new image."""
+        paths = [join(directory, i.filename + '.jpg') for i in self.lines]
+        new = [(i, p) for i, p in zip(self.lines, paths) if not isfile(p)]
+        x = self.distance_coords if distance else None
+        y = self.time if time else None
+        v = (self.velocity or 0.1) if depth else None
+        out = render_radargrams([i.array for i, p in new], [p for i, p in new], x, y, v, processes)
+        return(out)
  
     def export_line_arrays(self, directory):
-        """"""
-        d = directory
+        """Write each line to a MALA RD3 file with a RAD header built from the grid metadata."""
         for i in self.lines:
-            path = join(directory, i.filename + '.rd3')
             rd3 = join(directory, i.filename + '.rd3')
             if not isfile(rd3):
                 arr2rd3(i.array, rd3)
             rad = join(directory, i.filename + '.rad')
             if not isfile(rad):
-                with open(rad, 'w') as f:
-                    f.write('SAMPLES:' + str(self.samples) + '\r\n')
-                    f.write('FREQUENCY:' + str(self.frequency) + '\r\n')
-                    f.write('FREQUENCY STEPS: 1' + '\r\n')
-                    f.write('SIGNAL POSITION: 0' + '\r\n')
-                    f.write('RAW SIGNAL POSITION: 0' + '\r\n')
-                    f.write('DISTANCE FLAG: 1' + '\r\n')
-                    f.write('TIME FLAG: 0' + '\r\n')
-                    f.write('PROGRAM FLAG: 0' + '\r\n')
-                    f.write('EXTERNAL FLAG: 0' + '\r\n')
-                    f.write('TIME INTERVAL: 0' + '\r\n')
-                    f.write('DISTANCE INTERVAL:' + ' ' + str(self.step) + '\r\n')
-                    f.write('OPERATOR:' + '\r\n')
-                    f.write('CUSTOMER:' + '\r\n')
-                    f.write('SITE:' + '\r\n')
-                    f.write('ANTENNAS:   500' + '\r\n')
-                    f.write('ANTENNA ORIENTATION:' + '\r\n')
-                    f.write('ANTENNA SEPARATION:    0.1800' + '\r\n')
-                    f.write('COMMENT:Unknown=6' + '\r\n')
-                    f.write('TIMEWINDOW:   29.1982' + '\r\n')
-                    f.write('STACKS: 1' + '\r\n')
-                    f.write('STACK EXPONENT: 1' + '\r\n')
-                    f.write('STACKING TIME: 0' + '\r\n')
-                    f.write('LAST TRACE:' + str(self.traces) + '\r\n')
-                    f.write('STOP POSITION:' + ' ' + str.format('{0:.6f}', max(self.distance_coords)) + '\r\n')
-                    f.write('SYSTEM CALIBRATION:' + str.format('{0:.10f}', self.system_calibration) + '\r\n')
-                    f.write('START POSITION:' + str.format('{0:.6f}', min(self.distance_coords)) + '\r\n')
+                h = rad_header(self, start_position=min(self.distance_coords))
+                write_rad(h, rad)
  
 
 class Segment:
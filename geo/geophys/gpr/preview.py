@@ -0,0 +1,81 @@
+"""Build multi-resolution previews of radargrams for quick-look quality control.
+
+A preview is a pyramid of levels, each decimated by a fixed factor in both the sample and trace direction from the level before. Each level keeps the minimum, maximum and RMS amplitude of the block of samples and traces under every cell, so that peaks survive decimation. Pyramids are saved as a '.preview.npz' sidecar beside the data file and reused while the size and modification time of the file are unchanged.
+"""
+
+from os import stat
+from os.path import isfile
+import numpy as np
+
+MODES = ['min', 'max', 'rms']
+
+
+def block_reduce(array, factor, ufunc, counts=False):
+    """Reduce blocks of factor x factor cells of a 2D array with a ufunc in a single 'reduceat' pass per axis; blocks at the edges may be partial. With 'counts' the number of cells of each block is also returned."""
+    i = np.arange(0, array.shape[0], factor)
+    j = np.arange(0, array.shape[1], factor)
+    r = ufunc.reduceat(ufunc.reduceat(array, i, axis=0), j, axis=1)
+    if counts:
+        n = np.outer(np.diff(np.append(i, array.shape[0])), np.diff(np.append(j, array.shape[1])))
+        return(r, n)
+    return(r)
+
+def first_level(array, factor=4, chunk=4096):
+    """Return the minimum, maximum, mean square and cell count of blocks of factor x factor cells of a radargram. Traces are read and converted to float in blocks of about 'chunk' traces aligned to the factor, so that a memory-mapped file is never copied whole."""
+    w = max(chunk // factor, 1) * factor
+    parts = []
+    for j in range(0, array.shape[1], w):
+        a = np.asarray(array[:, j:j + w], dtype=float)
+        sq, n = block_reduce(a ** 2, factor, np.add, counts=True)
+        parts.append((block_reduce(a, factor, np.minimum), block_reduce(a, factor, np.maximum), sq / n, n))
+    mn, mx, sq, n = [np.concatenate(i, axis=1) for i in zip(*parts)]
+    return(mn, mx, sq, n)
+
+def preview_levels(array, factor=4, size=64, chunk=4096):
+    """Return a list of preview levels of a radargram, each a dictionary of 'min', 'max' and 'rms' arrays, from a first level decimated once down to the first level no larger than 'size' in both directions.
+        Attributes:
+            array <numpy.array>: A radargram array (samples x traces), e.g. a memory-mapped RD3 file;
+            factor <int>: the decimation of each level in both directions;
+            size <int>: the largest number of samples or traces of the smallest level;
+            chunk <int>: the number of traces read at a time for the first level.
+    """
+    mn, mx, sq, n = first_level(array, factor, chunk)
+    levels = [{'min': mn, 'max': mx, 'rms': np.sqrt(sq)}]
+    while max(mn.shape) > size:
+        mn = block_reduce(mn, factor, np.minimum)
+        mx = block_reduce(mx, factor, np.maximum)
+        sq = block_reduce(sq * n, factor, np.add)
+        n = block_reduce(n, factor, np.add)
+        sq = sq / n
+        levels.append({'min': mn, 'max': mx, 'rms': np.sqrt(sq)})
+    return(levels)
+
+def _stamp(path):
+    """Return the modification time and size of a file."""
+    st = stat(path)
+    return(np.array([st.st_mtime_ns, st.st_size]))
+
+def write_preview(path, levels):
+    """Write preview levels to the '.preview.npz' sidecar of a data file, stamped with the file's modification time and size, and return the sidecar path."""
+    npz = path + '.preview.npz'
+    arrays = {m + '_' + str(n): i[m].astype('float32') for n, i in enumerate(levels) for m in MODES}
+    np.savez_compressed(npz, stamp=_stamp(path), count=len(levels), **arrays)
+    return(npz)
+
+def read_preview(path):
+    """Return the preview levels of a data file from its sidecar, or None if there is no sidecar or the file has changed since it was written."""
+    npz = path + '.preview.npz'
+    if not isfile(npz):
+        return(None)
+    with np.load(npz) as f:
+        if not np.array_equal(f['stamp'], _stamp(path)):
+            return(None)
+        levels = [{m: f[m + '_' + str(n)] for m in MODES} for n in range(int(f['count']))]
+    return(levels)
+
+def preview_image(level, mode='rms'):
+    """Return a 2D image of a preview level: the 'rms' amplitude, the 'min' or 'max', or with 'peak' the larger absolute of the minimum and maximum with its sign."""
+    if mode == 'peak':
+        mn, mx = level['min'], level['max']
+        return(np.where(np.abs(mn) > np.abs(mx), mn, mx))
+    return(level[mode])
@@ -0,0 +1,245 @@
+"""Process GPR arrays in-process with vectorised filters.
+
+Each filter works on a radargram (samples x traces) or a whole grid (lines x samples x traces) at once; the sample (time) axis is always the second last axis and the trace axis the last. Filters can be combined into a serialisable Chain that is replayed over every file of a survey.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from os.path import basename, join
+import numpy as np
+from scipy.ndimage import uniform_filter1d, median_filter
+from scipy.signal import butter, sosfiltfilt, hilbert
+
+from .mala import RD3
+
+
+def dewow(array, window):
+    """Remove low-frequency 'wow' by subtracting the running mean of each trace.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            window <int>: the length (samples) of the running mean.
+    """
+    a = np.asarray(array, dtype=float)
+    a = a - uniform_filter1d(a, window, axis=-2, mode='nearest')
+    return(a)
+
+def time_zero(array, shift):
+    """Shift every trace up by a number of samples so that time zero is the first sample; the end of each trace is padded with zeros.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            shift <int>: the sample of time zero.
+    """
+    a = np.zeros(np.shape(array), dtype=float)
+    m = a.shape[-2]
+    a[..., :m - shift, :] = np.asarray(array)[..., shift:, :]
+    return(a)
+
+def agc(array, window):
+    """Apply automatic gain control by dividing each sample by the mean absolute amplitude of a running window.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            window <int>: the length (samples) of the gain window.
+    """
+    a = np.asarray(array, dtype=float)
+    e = uniform_filter1d(np.abs(a), window, axis=-2, mode='nearest')
+    a = np.divide(a, e, out=np.zeros_like(a), where=e > 0)
+    return(a)
+
+def sec(array, interval, attenuation=0.0, power=1.0):
+    """Apply spreading and exponential compensation gain; each sample is multiplied by t ** power * exp(attenuation * t).
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            interval <float>: the time interval (ns) between samples;
+            attenuation <float>: the exponential gain (1/ns);
+            power <float>: the power of the spreading gain.
+    """
+    a = np.asarray(array, dtype=float)
+    t = np.arange(1, a.shape[-2] + 1) * interval
+    g = t ** power * np.exp(attenuation * t)
+    a = a * g[:, None]
+    return(a)
+
+def background_removal(array, method='mean', window=None):
+    """Subtract the mean or median trace of each radargram, or of a running window of traces, to remove horizontal banding.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            method <str>: 'mean' or 'median';
+            window <int>: the number of traces of a running window; the whole radargram when None.
+    """
+    a = np.asarray(array, dtype=float)
+    if window:
+        size = [1] * (a.ndim - 1) + [window]
+        b = uniform_filter1d(a, window, axis=-1, mode='nearest') if method == 'mean' else median_filter(a, size=size, mode='nearest')
+    else:
+        b = a.mean(axis=-1, keepdims=True) if method == 'mean' else np.median(a, axis=-1, keepdims=True)
+    return(a - b)
+
+def bandpass(array, frequency, low, high, order=4):
+    """Apply a zero-phase Butterworth bandpass filter to every trace.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            frequency <float>: the sampling frequency (MHz) as recorded in the 'FREQUENCY' field of a MALA RAD file;
+            low <float>: the lower corner frequency (MHz);
+            high <float>: the upper corner frequency (MHz);
+            order <int>: the order of the filter.
+    """
+    sos = butter(order, [low, high], btype='band', fs=frequency, output='sos')
+    a = sosfiltfilt(sos, np.asarray(array, dtype=float), axis=-2)
+    return(a)
+
+def envelope(array, chunk=64):
+    """Return the instantaneous amplitude (Hilbert envelope) of every trace, computed with FFTs along the sample axis in chunks of lines or traces so that the working memory of the transforms stays bounded; the output is a float array of the size of the input, so 'timeslice.window_slices' reduces the envelope chunk by chunk instead.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            chunk <int>: the number of lines of a grid, or traces of a radargram, transformed at once.
+    """
+    a = np.asarray(array)
+    out = np.empty(a.shape, dtype=float)
+    axis = 0 if a.ndim > 2 else -1
+    n = a.shape[axis]
+    for i in range(0, n, chunk):
+        idx = [slice(None)] * a.ndim
+        idx[axis] = slice(i, i + chunk)
+        idx = tuple(idx)
+        out[idx] = np.abs(hilbert(a[idx].astype(float), axis=-2))
+    return(out)
+
+def first_break(array, method='threshold', threshold=0.2):
+    """Return the first-break (direct wave) time, in fractional samples, of every trace of a radargram (traces) or grid (lines x traces), picked for all traces at once.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            method <str>: 'threshold' picks the first sample whose absolute amplitude reaches a fraction of the trace maximum, interpolated linearly between samples; 'gradient' picks the steepest rise of the absolute amplitude, refined by a parabola through the neighbouring samples;
+            threshold <float>: the fraction of the trace maximum of the 'threshold' method.
+    """
+    a = np.abs(np.asarray(array, dtype=float))
+    if method == 'threshold':
+        t = threshold * a.max(axis=-2)
+        k = np.argmax(a >= t[..., None, :], axis=-2)
+        k0 = np.maximum(k - 1, 0)
+        a0 = np.take_along_axis(a, k0[..., None, :], -2)[..., 0, :]
+        a1 = np.take_along_axis(a, k[..., None, :], -2)[..., 0, :]
+        frac = np.divide(t - a0, a1 - a0, out=np.ones(t.shape), where=a1 > a0)
+        pick = np.where(k > 0, k0 + np.clip(frac, 0, 1), 0)
+    elif method == 'gradient':
+        g = np.diff(a, axis=-2)
+        k = np.clip(np.argmax(g, axis=-2), 1, g.shape[-2] - 2)
+        gm, g0, gp = [np.take_along_axis(g, (k + i)[..., None, :], -2)[..., 0, :] for i in (-1, 0, 1)]
+        den = gm - 2 * g0 + gp
+        pick = k + 0.5 + np.clip(np.divide(gm - gp, 2 * den, out=np.zeros(den.shape), where=den != 0), -0.5, 0.5)
+    else:
+        raise ValueError("Method must be 'threshold' or 'gradient'.")
+    return(pick)
+
+def shift_traces(array, shifts):
+    """Shift every trace up by its own, possibly fractional, number of samples with an FFT phase shift of the zero-padded traces; samples shifted in from beyond the trace are near zero.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            shifts <numpy.array>: the shift (samples) of every trace, shaped as the array without its sample axis, or a single value.
+    """
+    a = np.asarray(array, dtype=float)
+    n = a.shape[-2]
+    nfft = 1 << (2 * n - 1).bit_length()
+    s = np.broadcast_to(np.asarray(shifts, dtype=float), a.shape[:-2] + a.shape[-1:])
+    f = np.fft.rfftfreq(nfft)
+    F = np.fft.rfft(a, nfft, axis=-2) * np.exp(2j * np.pi * f[:, None] * s[..., None, :])
+    return(np.fft.irfft(F, nfft, axis=-2)[..., :n, :])
+
+def align_time_zero(array, target=None, method='threshold', threshold=0.2):
+    """Pick the first break of every trace and shift the traces so that all first breaks fall at the same sample.
+        Attributes:
+            array <numpy.array>: A radargram or grid array;
+            target <float>: the sample of the aligned first breaks; the median pick when None, which removes drift without moving time zero;
+            method <str>: the picking method of 'first_break';
+            threshold <float>: the threshold of the 'threshold' method.
+    """
+    p = first_break(array, method, threshold)
+    t = np.median(p) if target is None else target
+    return(shift_traces(array, p - t))
+
+
+STEPS = {
+    'dewow': dewow,
+    'time_zero': time_zero,
+    'align_time_zero': align_time_zero,
+    'agc': agc,
+    'sec': sec,
+    'background_removal': background_removal,
+    'bandpass': bandpass,
+    'envelope': envelope,
+}
+
+
+class Chain:
+    """An ordered list of processing steps that can be applied to an array, saved to and loaded from JSON, and replayed over the files of a survey.
+        Attributes:
+            steps <list>: a list of (name, arguments) tuples where name is a key of STEPS and arguments a dictionary of keyword arguments.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = []
+        for name, kwargs in steps or []:
+            self.add(name, **kwargs)
+
+    def __call__(self, array):
+        """Return the array processed by every step in order."""
+        a = array
+        for name, kwargs in self.steps:
+            a = STEPS[name](a, **kwargs)
+        return(a)
+
+    def add(self, name, **kwargs):
+        """Append a step and return the chain."""
+        if name not in STEPS:
+            raise ValueError('Unknown processing step: ' + name + '. Steps are ' + ', '.join(STEPS) + '.')
+        self.steps.append((name, kwargs))
+        return(self)
+
+    def to_json(self):
+        """Return the chain as a JSON string."""
+        return(json.dumps([[name, kwargs] for name, kwargs in self.steps]))
+
+    @classmethod
+    def from_json(cls, text):
+        """Return a chain from a JSON string created by 'to_json'."""
+        return(cls([tuple(i) for i in json.loads(text)]))
+
+    def save(self, path):
+        """Write the chain to a JSON file."""
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        """Read a chain from a JSON file."""
+        with open(path, 'r') as f:
+            return(cls.from_json(f.read()))
+
+    def run(self, paths, directory, processes=None):
+        """Process MALA RD3 files in parallel, write the results with their RAD headers to a directory and return the output paths.
+            Attributes:
+                paths <list>: filesystem paths of MALA RD3 files;
+                directory <str>: the output directory; files keep their names;
+                processes <int>: the number of worker processes; processing is serial when 1.
+        """
+        outpaths = [join(directory, basename(i)) for i in paths]
+        args = (repeat(self.to_json()), paths, outpaths)
+        if processes == 1:
+            return(list(map(process_file, *args)))
+        with ProcessPoolExecutor(max_workers=processes) as ex:
+            out = list(ex.map(process_file, *args))
+        return(out)
+
+
+def process_file(chain, path, outpath):
+    """Process a MALA RD3 file with a chain given as JSON and write the result, clipped to the int16 range of the format.
+        Attributes:
+            chain <str>: a processing chain from 'Chain.to_json';
+            path <str>: filesystem path of the input RD3 file;
+            outpath <str>: filesystem path of the output RD3 file.
+    """
+    d = RD3(path)
+    a = Chain.from_json(chain)(d.array)
+    d.array = np.clip(np.rint(a), -32768, 32767).astype('int16')
+    d.write_array(outpath)
+    return(outpath)
@@ -0,0 +1,131 @@
+"""Render radargram images in parallel without a display.
+
+Each worker process draws with the Agg canvas directly and keeps one figure and image artist for each image size, so that rendering a line only swaps the image data, extent and colour limits before saving.
+"""
+
+import time
+from os.path import basename
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .calculations import ns2mm, mm2ns
+from .mala import RD3
+from .preview import preview_image
+
+# figures reused within a worker process, keyed by image shape and plot options
+_FIGURES = {}
+
+
+def _figure(shape, velocity, options):
+    """Return a cached figure, axes and image artist for an array shape and set of plot options."""
+    key = (shape, velocity, tuple(sorted(options.items())))
+    if key not in _FIGURES:
+        fig = Figure(figsize=options['figsize'])
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        im = ax.imshow(np.zeros(shape), cmap=options['cmap'], aspect='auto', interpolation=options['interpolation'])
+        if velocity:
+            f = lambda t: ns2mm(t / 2, velocity) / 1000
+            g = lambda d: mm2ns(d * 1000, velocity) * 2
+            ax.secondary_yaxis('right', functions=(f, g)).set_ylabel('Depth (m)')
+        _FIGURES[key] = (fig, ax, im)
+    return(_FIGURES[key])
+
+def render_radargram(array, path, x=None, y=None, velocity=None, vmin=None, vmax=None, figsize=(29.7/2.54, 21/2/2.54), cmap='Greys_r', interpolation='bicubic', dpi=150):
+    """Render a radargram array to an image file and return the path and the time (s) taken.
+        Attributes:
+            array <numpy.array>: A radargram array (samples x traces);
+            path <str>: filesystem path of the output image; the format is taken from the extension;
+            x <list>: distance (m) of each trace; trace numbers are used when None;
+            y <list>: two-way time (ns) of each sample; sample numbers are used when None;
+            velocity <float>: velocity (m/ns) for a secondary depth axis; requires 'y';
+            vmin <float>: the lower colour limit; the array minimum when None;
+            vmax <float>: the upper colour limit; the array maximum when None.
+    """
+    t0 = time.perf_counter()
+    options = {'figsize': figsize, 'cmap': cmap, 'interpolation': interpolation}
+    v = velocity if y is not None else None
+    fig, ax, im = _figure(array.shape, v, options)
+    m, n = array.shape
+    ax.set_xlabel('Traces' if x is None else 'Distance (m)')
+    ax.set_ylabel('Samples' if y is None else 'Time (ns)')
+    x = np.arange(n) if x is None else np.asarray(x[:n])
+    y = np.arange(m) if y is None else np.asarray(y[:m])
+    dx = x[1] - x[0] if n > 1 else 1
+    dy = y[1] - y[0] if m > 1 else 1
+    im.set_data(array)
+    im.set_clim(np.min(array) if vmin is None else vmin, np.max(array) if vmax is None else vmax)
+    im.set_extent((x[0] - dx / 2, x[-1] + dx / 2, y[-1] + dy / 2, y[0] - dy / 2))
+    fig.savefig(path, dpi=dpi, bbox_inches='tight', pad_inches=0)
+    return(path, time.perf_counter() - t0)
+
+def _render(args):
+    """Unpack the arguments of 'render_radargram' for a process pool."""
+    array, path, x, y, velocity, kwargs = args
+    return(render_radargram(array, path, x, y, velocity, **kwargs))
+
+def render_radargrams(arrays, paths, x=None, y=None, velocity=None, processes=None, **kwargs):
+    """Render many radargram arrays to image files in a pool of worker processes and return a list of the path and render time (s) of each image.
+        Attributes:
+            arrays <list>: radargram arrays (samples x traces);
+            paths <list>: the output image path of each array;
+            x <list>: distance (m) of each trace, shared by all arrays;
+            y <list>: two-way time (ns) of each sample, shared by all arrays;
+            velocity <float>: velocity (m/ns) for a secondary depth axis;
+            processes <int>: the number of worker processes; rendering is serial when 1;
+            kwargs: further arguments of 'render_radargram'.
+    """
+    tasks = zip(arrays, paths, repeat(x), repeat(y), repeat(velocity), repeat(kwargs))
+    if processes == 1:
+        return([_render(i) for i in tasks])
+    with ProcessPoolExecutor(max_workers=processes) as ex:
+        out = list(ex.map(_render, tasks))
+    return(out)
+
+def _preview(path):
+    """Return the preview levels of a MALA RD3 file, building its sidecar if necessary, for a process pool."""
+    return(RD3(path, lazy=True).preview())
+
+def quicklook(path, outpath, level=0, mode='rms', **kwargs):
+    """Render a quick-look image of a MALA RD3 file from a level of its preview pyramid and return the path and render time (s); see 'render_radargram' for further arguments.
+        Attributes:
+            path <str>: filesystem path of a MALA RD3 file;
+            outpath <str>: filesystem path of the output image;
+            level <int>: the preview level; 0 is the largest;
+            mode <str>: 'rms', 'min', 'max' or 'peak' as in 'preview.preview_image'.
+    """
+    levels = _preview(path)
+    a = preview_image(levels[min(level, len(levels) - 1)], mode)
+    return(render_radargram(a, outpath, **kwargs))
+
+def contact_sheet(paths, outpath, level=-1, mode='rms', columns=6, size=(4, 2.5), cmap='Greys_r', dpi=100, processes=None):
+    """Render thumbnails of many MALA RD3 files, such as a whole survey, on one image from small levels of their preview pyramids and return the path. Missing previews are built in a pool of worker processes.
+        Attributes:
+            paths <list>: filesystem paths of MALA RD3 files;
+            outpath <str>: filesystem path of the output image;
+            level <int>: the preview level of the thumbnails; -1 is the smallest and levels beyond a file's smallest are clipped;
+            mode <str>: 'rms', 'min', 'max' or 'peak' as in 'preview.preview_image';
+            columns <int>: the number of thumbnails in each row;
+            size <tuple>: the width and height (inches) of each thumbnail;
+            processes <int>: the number of worker processes; previews are read serially when 1.
+    """
+    if processes == 1:
+        previews = [_preview(i) for i in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as ex:
+            previews = list(ex.map(_preview, paths))
+    rows = max(-(-len(paths) // columns), 1)
+    fig = Figure(figsize=(size[0] * columns, size[1] * rows))
+    FigureCanvasAgg(fig)
+    for n, (p, levels) in enumerate(zip(paths, previews)):
+        l = levels[max(min(level, len(levels) - 1), -len(levels))]
+        ax = fig.add_subplot(rows, columns, n + 1)
+        ax.imshow(preview_image(l, mode), cmap=cmap, aspect='auto', interpolation='nearest')
+        ax.set_title(basename(p), fontsize=8)
+        ax.set_axis_off()
+    fig.tight_layout()
+    fig.savefig(outpath, dpi=dpi)
+    return(outpath)
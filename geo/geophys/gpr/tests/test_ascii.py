@@ -0,0 +1,61 @@
+"""Tests that the ASCII writer matches the original per-value formatter byte for byte."""
+
+import numpy as np
+import pytest
+
+from geo.geophys.gpr.ascii import write_ascii
+
+
+def old_line_to_ascii4(line, path):
+    """The original 4-column formatter."""
+    x = line.start_position
+    y = line.transect_coord
+    with open(path, 'w') as f:
+        for array in line.array.T:
+            for amp, time in zip(array, line.time):
+                s = lambda x: str.format('{0:.6f}', x)[::-1]
+                d = s(x)
+                l = s(y)
+                t = s(time)
+                a = s(amp)
+                f.write(str(a.ljust(15) + t.ljust(15) + l.ljust(15) + d.ljust(14))[::-1] + '\r\n')
+            x = round(x + line.step, 6)
+
+def old_line_to_ascii3(line, path):
+    """The original 3-column formatter."""
+    x = line.start_position
+    with open(path, 'w') as f:
+        for array in line.array.T:
+            for amp, time in zip(array, line.time):
+                s = lambda x: str.format('{0:.6f}', x)[::-1]
+                d = s(x)
+                t = s(time)
+                a = s(amp)
+                f.write(str(a.ljust(15) + t.ljust(15) + d.ljust(14))[::-1] + '\r\n')
+            x = round(x + line.step, 6)
+
+def old_line_to_ascii1(line, path):
+    """The original 1-column formatter."""
+    with open(path, 'w') as f:
+        for array in line.array.T:
+            for amp, time in zip(array, line.time):
+                s = lambda x: str.format('{0:.6f}', x)[::-1]
+                a = s(amp)
+                f.write(str(a.ljust(15))[::-1] + '\r\n')
+
+
+class Line:
+    def __init__(self):
+        self.array = np.random.default_rng(0).integers(-32768, 32767, (40, 600)).astype('int16')
+        self.time = [round(i * 0.10016, 5) for i in range(1, 39)]
+        self.start_position = 1.25
+        self.step = 0.05
+        self.transect_coord = -3.5
+
+
+@pytest.mark.parametrize('columns, old', [(1, old_line_to_ascii1), (3, old_line_to_ascii3), (4, old_line_to_ascii4)])
+def test_write_ascii_matches_old_formatter(tmp_path, columns, old):
+    line = Line()
+    old(line, str(tmp_path / 'old.txt'))
+    write_ascii(line, str(tmp_path / 'new.txt'), columns, chunk=64)
+    assert (tmp_path / 'new.txt').read_bytes() == (tmp_path / 'old.txt').read_bytes()
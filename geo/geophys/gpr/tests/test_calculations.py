@@ -0,0 +1,19 @@
+"""Tests of the Axis type."""
+
+import pytest
+
+from geo.geophys.gpr.calculations import Axis
+
+
+@pytest.mark.parametrize('axis', [Axis(0.1, 0.1001647, 5000, 5), Axis(0.1, 0.0123456789, 5000, 7), Axis(0.1, 1 / 3, 3000, 5)])
+def test_axis_contains_its_values(axis):
+    """Every value of an axis with a non-terminating step, taken by index or by iteration, is found on the axis at its own index."""
+    assert all(axis[i] in axis and axis.index(axis[i]) == i for i in range(len(axis)))
+    assert list(axis) == [axis[i] for i in range(len(axis))]
+    assert all(v in axis for v in axis)
+
+def test_axis_rejects_values_off_the_axis():
+    axis = Axis(0, 0.05, 10, 7)
+    assert 0.05 in axis
+    assert 0.051 not in axis
+    assert 0.5 not in axis
@@ -0,0 +1,19 @@
+"""Tests of the preview pyramids of radargrams."""
+
+import numpy as np
+
+from geo.geophys.gpr.preview import preview_levels
+
+
+def test_preview_levels_chunks(tmp_path):
+    """The first level read from a memory-mapped file in blocks of traces matches the level of the whole array."""
+    a = np.random.default_rng(0).integers(-3000, 3000, (50, 1003)).astype('int16')
+    a.tofile(str(tmp_path / 'a.bin'))
+    m = np.memmap(str(tmp_path / 'a.bin'), dtype='int16', mode='r', shape=a.shape)
+    whole = preview_levels(a, chunk=a.shape[1])
+    chunked = preview_levels(m, chunk=100)
+    assert len(whole) == len(chunked) == 2
+    for i, j in zip(whole, chunked):
+        for k in i:
+            np.testing.assert_allclose(i[k], j[k], rtol=1e-12)
+    np.testing.assert_array_equal(chunked[0]['max'][0, 25], a[:4, 100:104].max())
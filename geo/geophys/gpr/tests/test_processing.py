@@ -0,0 +1,25 @@
+"""Tests of processing MALA files with a chain."""
+
+import numpy as np
+
+from geo.geophys.gpr.mala import arr2rd3, rad2dict, rad_header, write_rad
+from geo.geophys.gpr.processing import Chain, process_file
+
+
+class Metadata:
+    samples = 8
+    frequency = 1000.
+    step = 0.05
+    traces = 5
+    start_position = 1.5
+
+
+def test_process_file_keeps_source_header(tmp_path):
+    """Fields other than the samples, traces, time window and positions are copied from the source header."""
+    h = rad_header(Metadata(), antennas=250, antenna_separation=0.1)
+    h['SIGNAL POSITION'] = '12.5'
+    h['OPERATOR'] = 'surveyor'
+    write_rad(h, str(tmp_path / 'a.rad'))
+    arr2rd3(np.arange(40).reshape(8, 5), str(tmp_path / 'a.rd3'))
+    out = process_file(Chain([('time_zero', {'shift': 1})]).to_json(), str(tmp_path / 'a.rd3'), str(tmp_path / 'b.rd3'))
+    assert rad2dict(out, raw=True) == rad2dict(str(tmp_path / 'a.rad'), raw=True)
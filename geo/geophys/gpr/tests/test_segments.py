@@ -0,0 +1,50 @@
+"""Tests that the vectorised segment assembly matches the original loops."""
+
+import itertools
+import numpy as np
+
+from geo.geophys.gpr.gpr import segments2line
+
+
+def old_traceidx(ndarray, start_trace, positive = True):
+    """The original list-based trace indices."""
+    a, t, pos = ndarray, start_trace, positive
+    n = lambda a: a.shape[1]
+    if pos:
+        idx = [i for i in range(t, t + n(a))]
+    else:
+        a = np.flip(a, 1)
+        idx = [i for i in range(t, t - n(a), -1)]
+    return(idx)
+
+def old_segments2line(segments):
+    """The original element-by-element segment assembly."""
+    s = segments
+    a = [i[0] for i in s]
+    idx = [old_traceidx(i[0], i[1], i[2]) for i in s]
+    y = min([i.shape[0] for i in a])
+    x = max(itertools.chain.from_iterable(idx)) + 1
+    ar = (np.zeros((y, x)))
+    for i in [i for i in zip(a, idx)]:
+        for m, row in enumerate(i[0]):
+            if m < ar.shape[0]:
+                for n, col in enumerate(i[1]):
+                    if n < ar.shape[1]:
+                        ar[m][col] = i[0][m][n]
+    return(ar)
+
+
+def test_segments2line_matches_old():
+    """Forward and reversed segments with gaps, overlaps and unequal sample counts."""
+    r = np.random.default_rng(0)
+    segments = [
+        (r.integers(-100, 100, (20, 15)), 0, True),
+        (r.integers(-100, 100, (18, 10)), 30, False),
+        (r.integers(-100, 100, (22, 12)), 10, True),
+        (r.integers(-100, 100, (20, 5)), 40, True),
+    ]
+    np.testing.assert_array_equal(segments2line(segments), old_segments2line(segments))
+
+def test_segments2line_single_reversed():
+    a = np.arange(12).reshape(3, 4)
+    np.testing.assert_array_equal(segments2line([(a, 3, False)]), old_segments2line([(a, 3, False)]))
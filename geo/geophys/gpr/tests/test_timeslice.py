@@ -0,0 +1,49 @@
+"""Tests of the window reductions of the timeslice module."""
+
+import numpy as np
+
+from geo.geophys.gpr.timeslice import reduce_windows, window_index, window_slices, SliceCube
+
+
+def test_reduce_windows_last_edge_past_data():
+    """A window starting past the data must not shorten the window before it."""
+    start, stop = window_index(np.arange(10), [0, 5, 10, 15])
+    r = reduce_windows(np.arange(1, 11.), start, stop)
+    np.testing.assert_array_equal(r, [15, 40, np.nan])
+
+def test_reduce_windows_empty_windows():
+    """Empty windows are NaN and do not change their neighbours."""
+    start, stop = window_index(np.arange(10), [0, 3, 3, 7, 20, 30])
+    a = np.arange(1, 11.)
+    np.testing.assert_array_equal(reduce_windows(a, start, stop), [6, np.nan, 22, 27, np.nan])
+    np.testing.assert_array_equal(reduce_windows(a, start, stop, np.maximum), [3, np.nan, 7, 10, np.nan])
+
+def test_window_slices_last_edge_past_data():
+    a = np.ones((2, 10, 3))
+    r = window_slices(a, np.arange(10), [0, 5, 10, 15], axis=1, normalise=False)
+    np.testing.assert_array_equal(r[:, 0, 0], [5, 5, np.nan])
+
+def test_window_slices_clipped_int16():
+    """Samples clipped at the int16 minimum count at their full magnitude."""
+    a = np.full((1, 4, 1), -32768, dtype='int16')
+    a[0, 1, 0] = 32767
+    values = np.arange(4)
+    r = window_slices(a, values, [0, 2, 4], axis=1, normalise=False)
+    np.testing.assert_array_equal(r[:, 0, 0], [65535, 65536])
+    r = window_slices(a, values, [0, 4], mode='max', axis=1, normalise=False)
+    np.testing.assert_array_equal(r[:, 0, 0], [32768])
+
+def test_window_slices_chunks():
+    """Reading the array in chunks of lines gives the slices of the whole array."""
+    a = np.random.default_rng(0).integers(-32768, 32767, (10, 40, 6)).astype('int16')
+    values = np.arange(40)
+    for envelope in [False, True]:
+        for mode in ['sum', 'rms', 'max']:
+            whole = window_slices(a, values, [0, 10, 25, 40], mode, axis=1, envelope=envelope, chunk=10)
+            chunked = window_slices(a, values, [0, 10, 25, 40], mode, axis=1, envelope=envelope, chunk=3)
+            np.testing.assert_allclose(chunked, whole)
+
+def test_slice_cube_windows_last_edge_past_data():
+    points = [(0., 0., float(t), float(t + 1)) for t in range(10)]
+    cube = SliceCube(points)
+    np.testing.assert_array_equal(cube.windows([0, 5, 10, 15])[:, 0, 0], [3, 8, np.nan])
@@ -0,0 +1,68 @@
+"""Export timeslices as tiled multi-resolution rasters.
+
+Slices are written straight from their arrays, either as tiled GeoTIFFs with internal overviews or as XYZ pyramids of PNG tiles, so that viewers only read the tiles of the area and zoom level on screen. Lower resolution levels are made by averaging blocks of cells; empty (NaN) cells are ignored and left transparent. Array rows run from the top (north) of the image to the bottom.
+"""
+
+from os import makedirs
+from os.path import isdir, join
+import warnings
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import Normalize
+from matplotlib.image import imsave
+
+from ...gis.raster import overview_factors, write_tiled_tif
+
+
+def decimate(array, factor=2):
+    """Return an array reduced by the mean of blocks of factor x factor cells over its last two axes, ignoring NaN; blocks at the edges may be partial.
+        Attributes:
+            array <numpy.array>: A slice (y x x) or stack of slices (slices x y x x);
+            factor <int>: the size of the blocks.
+    """
+    a = np.asarray(array, dtype=float)
+    m, n = a.shape[-2:]
+    M, N = -(-m // factor) * factor, -(-n // factor) * factor
+    p = np.full(a.shape[:-2] + (M, N), np.nan)
+    p[..., :m, :n] = a
+    p = p.reshape(a.shape[:-2] + (M // factor, factor, N // factor, factor))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # mean of empty blocks
+        d = np.nanmean(p, axis=(-3, -1))
+    return(d)
+
+def pyramid(array, tile=256):
+    """Return a list of an array and its successive halvings down to the first level that fits in a single tile."""
+    levels = [np.asarray(array, dtype=float)]
+    while max(levels[-1].shape[-2:]) > tile:
+        levels.append(decimate(levels[-1]))
+    return(levels)
+
+def write_xyz(array, directory, tile=256, cmap='rainbow', vmin=None, vmax=None):
+    """Write a slice as an XYZ pyramid of PNG tiles ('directory/z/x/y.png') and return the maximum zoom level. Zoom 0 is a single tile of the whole slice and the maximum zoom is full resolution; the pyramid is in pixel space (e.g. for a simple, non-geographic, web map).
+        Attributes:
+            array <numpy.array>: A slice (y x x); NaN cells are transparent;
+            directory <str>: the output directory;
+            tile <int>: the width and height (pixels) of the tiles;
+            cmap <str>: the matplotlib colour map;
+            vmin <float>: the lower colour limit; the slice minimum when None;
+            vmax <float>: the upper colour limit; the slice maximum when None.
+    """
+    levels = pyramid(array, tile)[::-1]
+    a = levels[-1]
+    norm = Normalize(np.nanmin(a) if vmin is None else vmin, np.nanmax(a) if vmax is None else vmax)
+    colours = colormaps[cmap]
+    for z, a in enumerate(levels):
+        rgba = colours(norm(a), bytes=True)
+        rgba[np.isnan(a)] = 0
+        m, n = a.shape
+        for x in range(-(-n // tile)):
+            d = join(directory, str(z), str(x))
+            if not isdir(d):
+                makedirs(d)
+            for y in range(-(-m // tile)):
+                t = np.zeros((tile, tile, 4), dtype='uint8')
+                b = rgba[y * tile:(y + 1) * tile, x * tile:(x + 1) * tile]
+                t[:b.shape[0], :b.shape[1]] = b
+                imsave(join(d, str(y) + '.png'), t)
+    return(len(levels) - 1)
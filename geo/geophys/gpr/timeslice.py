@@ -0,0 +1,150 @@
+"""Extract and aggregate timeslices from gridded GPR amplitudes.
+
+Scattered GPR points are indexed into a (time, y, x) array once so that any number of slices or time windows can be taken with array indexing rather than by filtering the full list of points for each slice.
+"""
+
+from os import makedirs
+from os.path import isdir, join
+import numpy as np
+
+from .processing import envelope as hilbert_envelope
+
+
+def window_index(values, edges):
+    """Return the start and stop (exclusive) indices of sorted values falling in each window [edges[i], edges[i+1]).
+        Attributes:
+            values <numpy.array>: sorted times or depths of the sample axis;
+            edges <list>: sorted window boundaries in the units of 'values'.
+    """
+    i = np.searchsorted(values, edges, side='left')
+    return(i[:-1], i[1:])
+
+def reduce_windows(array, start, stop, ufunc=np.add, axis=0):
+    """Reduce an array over contiguous windows of an axis in a single 'reduceat' pass. Empty windows are NaN.
+        Attributes:
+            array <numpy.array>: the array to reduce;
+            start <numpy.array>: the first index of each window;
+            stop <numpy.array>: the last index (exclusive) of each window; each window must start where the previous one stops;
+            ufunc <numpy.ufunc>: the reduction, e.g. numpy.add or numpy.maximum;
+            axis <int>: the axis to reduce.
+    """
+    n = array.shape[axis]
+    k = int(np.count_nonzero(start < n)) # windows starting past the data are left empty
+    shape = list(array.shape)
+    shape[axis] = len(start)
+    r = np.full(shape, np.nan)
+    if k:
+        idx = start[:k]
+        last = stop[k - 1] < n
+        if last:
+            idx = np.append(idx, stop[k - 1])
+        s = ufunc.reduceat(array, idx, axis=axis).astype(float)
+        s = np.delete(s, -1, axis=axis) if last else s
+        np.moveaxis(r, axis, 0)[:k] = np.moveaxis(s, axis, 0)
+    empty = np.flatnonzero(stop <= start)
+    np.moveaxis(r, axis, 0)[empty] = np.nan
+    return(r)
+
+def window_slices(array, values, edges, mode='sum', normalise=True, axis=0, envelope=False, chunk=8):
+    """Return a stack of slices (windows x ...) aggregating the absolute amplitude, or envelope, of an array over windows of its sample axis, such as depth or time windows. The array is read in chunks of lines (or traces of a radargram) that are converted to float, transformed and reduced one at a time, so only the output is the size of the grid.
+        Attributes:
+            array <numpy.array>: a 3D GPR array, e.g. lines x samples x traces; a memory-mapped array is read chunk by chunk;
+            values <list>: the sorted depth or time of each sample along 'axis';
+            edges <list>: sorted window boundaries in the units of 'values'; windows are [edges[i], edges[i+1]);
+            mode <str>: 'sum' of absolute amplitude, 'rms' amplitude or 'max' absolute amplitude;
+            normalise <bool>: divide each slice by its maximum;
+            axis <int>: the sample axis of the array;
+            envelope <bool>: aggregate the Hilbert envelope (instantaneous amplitude) instead of the absolute amplitude;
+            chunk <int>: the number of lines (or traces) read at a time.
+    """
+    if mode not in ('sum', 'rms', 'max'):
+        raise ValueError("Mode must be 'sum', 'rms' or 'max'.")
+    start, stop = window_index(np.asarray(values), edges)
+    ndim = len(array.shape)
+    axis = axis % ndim
+    c = 1 if axis == 0 else 0 # the axis read in chunks
+    shape = list(array.shape)
+    shape[axis] = len(start)
+    r = np.empty(shape)
+    ufunc = np.maximum if mode == 'max' else np.add
+    for i in range(0, array.shape[c], chunk):
+        idx = [slice(None)] * ndim
+        idx[c] = slice(i, i + chunk)
+        idx = tuple(idx)
+        a = np.asarray(array[idx], dtype=float) # abs(-32768) overflows in int16
+        if envelope:
+            a = np.moveaxis(hilbert_envelope(np.moveaxis(a, axis, -2), chunk), -2, axis)
+        else:
+            a = np.abs(a)
+        r[idx] = reduce_windows(a ** 2 if mode == 'rms' else a, start, stop, ufunc, axis)
+    if mode == 'rms':
+        count = np.maximum(stop - start, 1).reshape([-1 if i == axis else 1 for i in range(ndim)])
+        r = np.sqrt(r / count)
+    r = np.moveaxis(r, axis, 0)
+    if normalise:
+        mx = np.nanmax(r.reshape(len(r), -1), axis=1, initial=0).reshape([-1] + [1] * (r.ndim - 1))
+        r = np.divide(r, mx, out=np.full(r.shape, np.nan), where=mx > 0)
+    return(r)
+
+
+class SliceCube:
+    """A (time x y x x) array of GPR amplitudes built once from scattered points for the extraction of timeslices.
+        Attributes:
+            points <list or numpy.array>: x, y, time and amplitude of every point; either an (n x 4) array or a list of lines each a list of (x, y, time, amplitude) tuples (e.g. 'timeSlice.datLst' of the reflexw module).
+    """
+
+    def __init__(self, points):
+        p = points
+        if len(p) and isinstance(p[0], list):
+            p = [j for i in p for j in i]
+        p = np.asarray(p, dtype=float).reshape(-1, 4)
+        self.x, xi = np.unique(p[:,0], return_inverse=True)
+        self.y, yi = np.unique(p[:,1], return_inverse=True)
+        self.t, ti = np.unique(p[:,2], return_inverse=True)
+        self.array = np.full((len(self.t), len(self.y), len(self.x)), np.nan)
+        self.array[ti, yi, xi] = p[:,3]
+
+    def index(self, times):
+        """Return the indices of the given slice times; every time must exist in the cube."""
+        t = np.atleast_1d(np.asarray(times, dtype=float))
+        idx = np.clip(np.searchsorted(self.t, t), 0, len(self.t) - 1)
+        bad = ~np.isclose(self.t[idx], t)
+        if bad.any():
+            raise ValueError('Slice times not found: ' + str([float(i) for i in t[bad]]))
+        return(idx)
+
+    def slices(self, times=None):
+        """Return a (times x y x x) array of the requested slices; all slices when None."""
+        if times is None:
+            return(self.array)
+        return(self.array[self.index(times)])
+
+    def windows(self, edges):
+        """Return a (windows x y x x) array of the mean amplitude of the slices within each time window [edges[i], edges[i+1])."""
+        start, stop = window_index(self.t, edges)
+        valid = ~np.isnan(self.array)
+        total = reduce_windows(np.where(valid, self.array, 0), start, stop)
+        count = reduce_windows(valid.astype(int), start, stop)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+        return(mean)
+
+    def points(self, array):
+        """Return an (n x 3) array of the x, y and value of every non-null point of a 2D slice."""
+        yi, xi = np.nonzero(~np.isnan(array))
+        p = np.column_stack([self.x[xi], self.y[yi], array[yi, xi]])
+        return(p)
+
+    def write(self, arrays, directory, names):
+        """Write 2D slices to tab-delimited x, y, value ASCII files and return their paths.
+            Attributes:
+                arrays <numpy.array>: a stack of slices, e.g. from 'slices' or 'windows';
+                directory <str>: the output directory, created if it does not exist;
+                names <list>: the filename (without extension) of each slice.
+        """
+        if not isdir(directory):
+            makedirs(directory)
+        paths = [join(directory, i + '.ASC') for i in names]
+        for a, p in zip(arrays, paths):
+            np.savetxt(p, self.points(a), fmt='%.6f', delimiter='\t')
+        return(paths)
@@ -1,10 +1,13 @@
 """Process raster data"""
 
+import math
 from os import sep
 from os.path import join
+import numpy as np
 import gdal
 import osr
 import rasterio
+from rasterio.transform import Affine
 from rasterio.warp import calculate_default_transform, reproject, Resampling
 from tempfile import NamedTemporaryFile
 
@@ -113,6 +116,75 @@ def reproject_tif(inpath, outpath, crs='EPSG:4326'):
                     dst_crs=dst_crs,
                     resampling=Resampling.nearest)
  
+def grid_geotransform(origin, cell, rotation=0):
+    """Return the GDAL geotransform of a regular grid from the coordinates of its upper-left corner, its cell size and its rotation.
+        Attributes:
+            origin <tuple>: the x and y coordinates of the outer upper-left corner of the first cell (first row and column) of the array;
+            cell <float or tuple>: the cell size, or the width and height of a cell, in the units of the coordinates;
+            rotation <float>: the anticlockwise angle (degrees) of the array rows from the x-axis (east).
+    """
+    dx, dy = cell if isinstance(cell, (tuple, list)) else (cell, cell)
+    a = math.radians(rotation)
+    c, s = math.cos(a), math.sin(a)
+    gt = (origin[0], dx * c, dy * s, origin[1], dx * s, -dy * c)
+    return(gt)
+
+def corners_geotransform(corners, shape):
+    """Return the GDAL geotransform of an array from the coordinates of its corners, ordered as for 'RectifyTif.rectify' (lower-left, upper-left, upper-right, lower-right); the lower-right corner is implied by the others.
+        Attributes:
+            corners <list>: the x and y coordinates of the outer corners of the array;
+            shape <tuple>: the number of rows and columns of the array.
+    """
+    (llx, lly), (ulx, uly), (urx, ury) = corners[:3]
+    m, n = shape[-2:]
+    gt = (ulx, (urx - ulx) / n, (llx - ulx) / m, uly, (ury - uly) / n, (lly - uly) / m)
+    return(gt)
+
+def overview_factors(shape, tile=256):
+    """Return the overview decimation factors (2, 4, 8...) of a raster down to the first level that fits in a single tile."""
+    f, lst = 2, []
+    while max(shape[-2:]) / (f // 2) > tile:
+        lst.append(f)
+        f *= 2
+    return(lst)
+
+def write_tiled_tif(array, path, transform, crs=None, tile=256, overviews=None, resampling='average', compress='deflate'):
+    """Write an array, or a stack of arrays as bands, to a tiled GeoTIFF with internal overviews and return the path.
+        Attributes:
+            array <numpy.array>: An array (rows x columns) or stack of arrays (bands x rows x columns); NaN cells are written as nodata;
+            path <str>: filesystem path of the output GeoTIFF;
+            transform <tuple>: the GDAL geotransform (x0, dx, rx, y0, ry, dy) of the array, e.g. from 'grid_geotransform' or 'corners_geotransform';
+            crs <str>: the coordinate reference system, e.g. 'EPSG:28356';
+            tile <int>: the width and height (pixels) of the tiles; a multiple of 16;
+            overviews <list>: the overview decimation factors; halvings down to a single tile when None;
+            resampling <str>: the rasterio resampling method of the overviews;
+            compress <str>: the compression of the tiles.
+    """
+    a = np.asarray(array, dtype='float32')
+    a = a[None] if a.ndim == 2 else a
+    factors = overview_factors(a.shape, tile) if overviews is None else overviews
+    profile = {
+        'driver': 'GTiff',
+        'count': a.shape[0],
+        'height': a.shape[1],
+        'width': a.shape[2],
+        'dtype': 'float32',
+        'crs': crs,
+        'transform': Affine.from_gdal(*transform),
+        'nodata': np.nan,
+        'tiled': True,
+        'blockxsize': tile,
+        'blockysize': tile,
+        'compress': compress,
+    }
+    with rasterio.open(path, 'w', **profile) as dst:
+        dst.write(a)
+        if factors:
+            dst.build_overviews(factors, Resampling[resampling])
+            dst.update_tags(ns='rio_overview', resampling=resampling)
+    return(path)
+
+
 class RectifyTif:
     """Rectify a tif image using the known coordinates of the image corners. Useful for rectifying rectangular geophysical maps."""
 
@@ -150,5 +222,11 @@ class RectifyTif:
         ds = None
     
         return(tmp.name)
+
+    def georeference(self, path, array, corners, epsg):
+        """Write an array, or a stack of arrays as bands, straight to a tiled and georeferenced GeoTIFF from the coordinates of its corners, ordered as for 'rectify', without rendering or warping an image; see 'write_tiled_tif'."""
+        gt = corners_geotransform(corners, array.shape)
+        crs = 'EPSG:' + str(epsg) if epsg else None
+        return(write_tiled_tif(array, path, gt, crs))
     
 